@@ -0,0 +1,279 @@
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+import yaml
+from benchmarks.stand_in_server import KINDS, StandInServer
+from config.settings import CONFIG_DIR, HAR_PATH, setup_logging
+from parser.browser_pool import BrowserPool
+from parser.executor import ParseExecutor
+from parser.har_archive import HarArchive
+from parser.http_client import HttpClient
+from parser.parsers.site1_parser import Site1Parser
+from parser.parsers.site2_parser import Site2Parser
+from parser.parsers.site3_parser import Site3Parser
+from parser.session_store import SessionStore
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+PARSERS = {
+    "pinco": Site1Parser,
+    "martin": Site2Parser,
+    "onx": Site3Parser,
+}
+
+logger = logging.getLogger("benchmark")
+
+
+class RssSampler:
+    """Пиковый RSS процесса вместе с дочерними (драйвер Playwright и браузеры)"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> float:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        self._sample()
+        return self.peak_mb
+
+    async def _run(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def _sample(self):
+        self.peak_mb = max(self.peak_mb, self._tree_rss_mb())
+
+    @staticmethod
+    def _tree_rss_mb() -> float:
+        proc = Path("/proc")
+
+        if not proc.exists():
+            if resource is None:
+                return 0.0
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        # Строим дерево процессов по ppid и суммируем VmRSS потомков
+        children = defaultdict(list)
+        for stat_file in proc.glob("[0-9]*/stat"):
+            try:
+                fields = stat_file.read_text().rsplit(")", 1)[1].split()
+                children[int(fields[1])].append(int(stat_file.parent.name))
+            except (OSError, IndexError, ValueError):
+                continue
+
+        total_kb = 0
+        pending = [os.getpid()]
+        while pending:
+            pid = pending.pop()
+            pending.extend(children.get(pid, []))
+
+            try:
+                for line in (proc / str(pid) / "status").read_text().splitlines():
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            except OSError:
+                continue
+
+        return total_kb / 1024
+
+
+def build_site_configs(
+    server: StandInServer, sites_per_kind: int, fast_path: bool
+) -> list[dict]:
+    """Селекторы берутся из sites_config.yaml, адреса - из локального сервера"""
+    with open(CONFIG_DIR / "sites_config.yaml", "r", encoding="utf-8") as f:
+        templates = {site["id"]: site for site in yaml.safe_load(f)["sites"]}
+
+    site_configs = []
+    for kind in KINDS:
+        for index in range(sites_per_kind):
+            site_config = copy.deepcopy(templates[kind])
+            site_config["id"] = f"{kind}-{index}"
+            site_config["name"] = f"{templates[kind]['name']} #{index}"
+            site_config["kind"] = kind
+            site_config["auth"]["site_url"] = server.site_url(kind, index)
+            site_config["credentials"] = {"username": "bench", "password": "bench"}
+            if not fast_path:
+                site_config["topup"]["fast_path"] = False
+            site_configs.append(site_config)
+
+    return site_configs
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+
+    return statistics.quantiles(values, n=100, method="inclusive")[
+        round(fraction * 100) - 1
+    ]
+
+
+async def run_benchmark(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="casino-bench-"))
+    # Для --har replay порт должен совпадать с записью: адреса сайтов входят в HAR
+    server = StandInServer(
+        sites_per_kind=args.sites, latency=args.latency, port=args.port
+    )
+    await server.start()
+
+    site_configs = build_site_configs(server, args.sites, not args.no_fast_path)
+    browser_pool = BrowserPool(size=args.browsers)
+    http_client = HttpClient()
+    executor = ParseExecutor(concurrency=args.concurrency)
+    session_store = SessionStore(workdir / "sessions")
+
+    timings: dict[str, list[float]] = defaultdict(list)
+    rss = RssSampler()
+    rss.start()
+
+    async def worker(site_config: dict) -> dict:
+        parser = PARSERS[site_config["kind"]](site_config, browser_pool, http_client)
+        # Сессии и скриншоты бенчмарка не должны попасть в рабочие каталоги
+        parser.session_store = session_store
+        parser.screenshot_manager.base_path = workdir / "screenshots"
+        parser.har = HarArchive(site_config["id"], args.har, args.har_dir)
+
+        result = await parser.parse()
+
+        # Те же стадии, что ParserManager пишет в parse_timings
+        for stage, seconds in result.get("timings", {}).items():
+            timings[stage].append(seconds)
+
+        return result
+
+    cycles = []
+    try:
+        start = time.perf_counter()
+        await browser_pool.start()
+        browser_start = time.perf_counter() - start
+
+        for cycle in range(args.cycles):
+            results, summary = await executor.run(site_configs, worker)
+            summary["throughput"] = round(
+                summary["sites"] / summary["wall_time"] if summary["wall_time"] else 0,
+                2,
+            )
+            # Результат быстрого пути получен без аренды браузера
+            summary["fast_path"] = sum(
+                1
+                for r in results
+                if r.get("status") == "success"
+                and "browser_lease" not in r.get("timings", {})
+            )
+            cycles.append(summary)
+
+            logger.info(f"Cycle {cycle + 1}/{args.cycles}: {summary}")
+
+            failed = [r for r in results if r.get("status") != "success"]
+            for result in failed:
+                logger.warning(
+                    f"{result['site_id']}: {result.get('status')} {result.get('error_message')}"
+                )
+
+    finally:
+        peak_rss = await rss.stop()
+        await http_client.close()
+        await browser_pool.stop()
+        await server.stop()
+
+    return {
+        "sites": len(site_configs),
+        "cycles": cycles,
+        "browser_start": round(browser_start, 2),
+        "stages": {
+            stage: {
+                "count": len(values),
+                "mean": round(statistics.fmean(values), 3),
+                "p50": round(percentile(values, 0.5), 3),
+                "p95": round(percentile(values, 0.95), 3),
+                "max": round(max(values), 3),
+            }
+            for stage, values in timings.items()
+            if values
+        },
+        "peak_rss_mb": round(peak_rss, 1),
+        "server": server.stats,
+        "workdir": str(workdir),
+    }
+
+
+def print_report(report: dict):
+    print(f"\nSites: {report['sites']}, browser start: {report['browser_start']}s")
+
+    print("\nCycle   wall,s   sum,s   sites/s   success  errors  timeouts  fast")
+    for number, cycle in enumerate(report["cycles"], start=1):
+        print(
+            f"{number:>5} {cycle['wall_time']:>8} {cycle['sum_site_time']:>7} "
+            f"{cycle['throughput']:>9} {cycle['success']:>8} {cycle['errors']:>7} "
+            f"{cycle['timeouts']:>9} {cycle['fast_path']:>5}"
+        )
+
+    print("\nStage                count    mean     p50     p95     max")
+    for stage, stats in report["stages"].items():
+        print(
+            f"{stage:<20} {stats['count']:>5} {stats['mean']:>7} "
+            f"{stats['p50']:>7} {stats['p95']:>7} {stats['max']:>7}"
+        )
+
+    print(f"\nPeak RSS (process tree): {report['peak_rss_mb']} MB")
+    print(f"Stand-in server: {report['server']}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Parse benchmark on stand-in sites. "
+        "Example: python -m benchmarks.run_benchmark --sites 5 --cycles 3 --concurrency 4"
+    )
+    arg_parser.add_argument("--sites", type=int, default=1, help="sites per kind")
+    arg_parser.add_argument("--cycles", type=int, default=2)
+    arg_parser.add_argument("--concurrency", type=int, default=2)
+    arg_parser.add_argument("--browsers", type=int, default=1)
+    arg_parser.add_argument(
+        "--latency", type=float, default=0.0, help="server delay per request, s"
+    )
+    arg_parser.add_argument("--no-fast-path", action="store_true")
+    arg_parser.add_argument("--port", type=int, default=0, help="stand-in server port")
+    arg_parser.add_argument(
+        "--har", choices=HarArchive.MODES, default="off", help="record or replay HAR"
+    )
+    arg_parser.add_argument("--har-dir", type=Path, default=HAR_PATH / "benchmark")
+    arg_parser.add_argument("--json", type=Path, help="write report to file")
+    args = arg_parser.parse_args()
+
+    setup_logging()
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import json
+import logging
+from aiohttp import web
+
+
+# Общая часть страниц: логин через форму ставит cookie, API кассы без нее отдает 401
+COMMON_SCRIPT = """
+const BASE = "__BASE__";
+const isAuthed = () => document.cookie.split("; ").includes("bench_auth=" + BASE.slice(1));
+const $ = (selector) => document.querySelector(selector);
+
+function login() {
+    document.cookie = "bench_auth=" + BASE.slice(1) + "; path=/; max-age=86400";
+    render();
+}
+
+async function loadJson(path) {
+    const response = await fetch(BASE + path, {credentials: "same-origin"});
+    return response.json();
+}
+
+function renderList(container, items) {
+    container.innerHTML = items
+        .map((item) => `<div class="method">${item.name}: ${item.min}</div>`)
+        .join("");
+}
+"""
+
+SITE1_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Pinco stand-in</title>
+<style>pu-balance-widget, pu-payments-list { display: block; padding: 8px; }</style>
+</head><body>
+<header id="header"></header>
+<div id="login-form" hidden>
+    <input id="login"><input id="password" type="password">
+    <button data-testid="loginBtn">Войти</button>
+</div>
+<pu-payments-list id="payments" hidden></pu-payments-list>
+<script>
+__COMMON__
+function render() {
+    if (isAuthed()) {
+        $("#login-form").hidden = true;
+        $("#header").innerHTML =
+            '<pu-balance-widget>1000 ₽</pu-balance-widget><button class="pu-header__wallet">Касса</button>';
+        $(".pu-header__wallet").onclick = async () => {
+            const data = await loadJson("/api/cashbox/deposit/methods");
+            renderList($("#payments"), data.methods.map((m) => ({name: m.popUpName, min: m.limit.RUB.min})));
+            $("#payments").hidden = false;
+        };
+    } else {
+        $("#header").innerHTML = '<button class="pu-header__login">Вход</button>';
+        $(".pu-header__login").onclick = () => { $("#login-form").hidden = false; };
+    }
+}
+$("[data-testid='loginBtn']").onclick = login;
+render();
+</script>
+</body></html>
+"""
+
+SITE2_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Martin stand-in</title></head><body>
+<header id="header"></header>
+<form id="login-form" hidden onsubmit="return false">
+    <input id="email"><input id="password" type="password">
+    <button data-test="auth-form-btn">Войти</button>
+</form>
+<div data-test="payment_providers_list" hidden>
+    <div class="payment__payment-providers-list"></div>
+</div>
+<script>
+__COMMON__
+function render() {
+    if (isAuthed()) {
+        $("#login-form").hidden = true;
+        $("#header").innerHTML =
+            '<div class="user-top__auth">bench</div><button data-test="main_deposit">Депозит</button>';
+        $("[data-test='main_deposit']").onclick = async () => {
+            const data = await loadJson("/api/v4/cashbox/payment_methods");
+            renderList(
+                $(".payment__payment-providers-list"),
+                data.payment_methods.map((m) => ({name: m.child_system_name || m.child_system, min: m.limit.min}))
+            );
+            $("[data-test='payment_providers_list']").hidden = false;
+        };
+    } else {
+        $("#header").innerHTML = '<span class="registration-form__login-link">Вход</span>';
+        $(".registration-form__login-link").onclick = () => { $("#login-form").hidden = false; };
+    }
+}
+$("[data-test='auth-form-btn']").onclick = login;
+render();
+</script>
+</body></html>
+"""
+
+# Кнопка в таб-баре - и вход, и касса; открытая касса переживает reload через ?cashbox=1
+SITE3_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>OnX stand-in</title></head><body>
+<div class="infoMessageCookieBtn___xQJnw">OK</div>
+<header id="header"></header>
+<div id="login-form" hidden>
+    <input data-test="input_email"><input data-test="input_password" type="password">
+    <button data-test="submit_button">Войти</button>
+</div>
+<div id="cashbox" hidden>
+    <div class="Popup__banner">Бонус <button class="Pressable__close--banner">×</button></div>
+    <div class="PayMethods__container"></div>
+</div>
+<nav><a class="tapBarLinkCentered___eL2Wm">Вход</a></nav>
+<script>
+__COMMON__
+function openCashbox() {
+    history.replaceState(null, "", "?cashbox=1");
+    $("#cashbox").hidden = false;
+}
+function render() {
+    if (isAuthed()) {
+        $("#login-form").hidden = true;
+        $("#header").innerHTML = '<div class="headerElementBox___Qi31k">bench</div>';
+        $(".tapBarLinkCentered___eL2Wm").onclick = openCashbox;
+        if (location.search.includes("cashbox=1")) openCashbox();
+    } else {
+        $(".tapBarLinkCentered___eL2Wm").onclick = () => { $("#login-form").hidden = false; };
+    }
+}
+$(".infoMessageCookieBtn___xQJnw").onclick = (e) => { e.target.hidden = true; };
+$("[data-test='submit_button']").onclick = login;
+$(".Pressable__close--banner").onclick = async () => {
+    const data = await loadJson("/billcheckout.com/api/checkout/methods");
+    renderList(
+        $(".PayMethods__container"),
+        data.details.paymentSystems.map((m) => ({name: m.name, min: m.min_limit}))
+    );
+};
+render();
+</script>
+</body></html>
+"""
+
+
+def site1_payload(index: int) -> dict:
+    methods = [
+        ("sbp", "СБП", 17, 100),
+        ("card", "Банковская карта", 17, 500),
+        ("crypto", "Криптовалюта", 51, 1000),
+        ("Vouwallet", "Vouwallet", 17, 300),
+    ]
+    return {
+        "methods": [
+            {
+                "name": name,
+                "popUpName": f" {title} ",
+                "groups": [{"id": group_id}],
+                "limit": {"RUB": {"min": minimum + index}},
+            }
+            for name, title, group_id, minimum in methods
+        ]
+    }
+
+
+def site2_payload(index: int) -> dict:
+    methods = [
+        ("sbp_list", "sbp", None, "100.00"),
+        ("sber_list", "sber", "sberpay", "300.00"),
+        ("bank_card_list", "card", None, "500.00"),
+        ("crypto_list", "usdt", None, "1000.00"),
+    ]
+    return {
+        "payment_methods": [
+            {
+                "aggregate_type": aggregate_type,
+                "child_system": child_system,
+                "child_system_name": child_system_name,
+                "limit": {"min": f"{int(float(minimum)) + index}.00"},
+            }
+            for aggregate_type, child_system, child_system_name, minimum in methods
+        ]
+    }
+
+
+def site3_payload(index: int) -> dict:
+    methods = [
+        ("pay_p2p_sb", "сбербанк", "500.00"),
+        ("pay_p2p_tb", "т-банк", "500.00"),
+        ("sqp_phone_p2p", "сбп", "1000.00"),
+        ("pay_crypto", "crypto", "2000.00"),
+    ]
+    return {
+        "details": {
+            "paymentSystems": [
+                {
+                    "key": key,
+                    "name": name,
+                    "min_limit": f"{int(float(minimum)) + index}.00",
+                }
+                for key, name, minimum in methods
+            ]
+        }
+    }
+
+
+# Вид сайта -> (префикс пути, страница, путь API кассы, ответ API)
+KINDS = {
+    "pinco": ("s1", SITE1_PAGE, "api/cashbox/deposit/methods", site1_payload),
+    "martin": ("s2", SITE2_PAGE, "api/v4/cashbox/payment_methods", site2_payload),
+    "onx": ("s3", SITE3_PAGE, "billcheckout.com/api/checkout/methods", site3_payload),
+}
+
+
+class StandInServer:
+    """Локальная замена трех сайтов: N синтетических копий каждого на одном порту"""
+
+    def __init__(
+        self,
+        sites_per_kind: int = 1,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.sites_per_kind = sites_per_kind
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger("stand_in_server")
+
+        self._runner: web.AppRunner | None = None
+        self.stats = {"pages": 0, "api": 0, "not_modified": 0, "unauthorized": 0}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def site_url(self, kind: str, index: int) -> str:
+        # Путь с /ru как у настоящих сайтов; XHR кассы страница шлет на свой api_path
+        prefix = KINDS[kind][0]
+        return f"{self.base_url}/{prefix}-{index}/ru"
+
+    async def start(self) -> str:
+        app = web.Application()
+
+        for kind, (prefix, _, api_path, _) in KINDS.items():
+            for index in range(self.sites_per_kind):
+                site = f"/{prefix}-{index}"
+                app.router.add_get(f"{site}/ru", self._page_handler(kind, site))
+                app.router.add_get(
+                    f"{site}/{api_path}", self._api_handler(kind, site, index)
+                )
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+        self.logger.info(
+            f"Stand-in server on {self.base_url} "
+            f"({self.sites_per_kind} site(s) per kind, latency {self.latency}s)"
+        )
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _page_handler(self, kind: str, site: str):
+        html = (
+            KINDS[kind][1]
+            .replace("__COMMON__", COMMON_SCRIPT)
+            .replace("__BASE__", site)
+        )
+
+        async def handler(request: web.Request) -> web.Response:
+            self.stats["pages"] += 1
+            await self._delay()
+            return web.Response(text=html, content_type="text/html")
+
+        return handler
+
+    def _api_handler(self, kind: str, site: str, index: int):
+        body = json.dumps(KINDS[kind][3](index), ensure_ascii=False)
+        etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:16]}"'
+        cookie_name = "bench_auth"
+
+        async def handler(request: web.Request) -> web.Response:
+            self.stats["api"] += 1
+            await self._delay()
+
+            # Прямой запрос без сессии должен уйти в браузер, как на настоящем сайте
+            if request.cookies.get(cookie_name) != site[1:]:
+                self.stats["unauthorized"] += 1
+                return web.json_response({"error": "unauthorized"}, status=401)
+
+            if request.headers.get("If-None-Match") == etag:
+                self.stats["not_modified"] += 1
+                return web.Response(status=304, headers={"ETag": etag})
+
+            return web.Response(
+                text=body, content_type="application/json", headers={"ETag": etag}
+            )
+
+        return handler
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
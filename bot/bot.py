@@ -1,7 +1,10 @@
+import asyncio
+import html
 import os
-from pathlib import Path
+from datetime import datetime, timedelta, UTC
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject
 from aiogram.types import (
     FSInputFile,
     InlineKeyboardMarkup,
@@ -10,23 +13,49 @@ from aiogram.types import (
     ReplyKeyboardMarkup,
     KeyboardButton,
 )
+from bot.result_cache import ResultCache
+from bot.send_queue import SendQueue
+from config.settings import (
+    BOT_COALESCE_RESULTS,
+    BOT_STATS_INTERVAL_MINUTES,
+    DB_RETENTION_DAYS,
+    TELEGRAM_ADMIN_ID,
+)
 from database.db_manager import DBManager
+from parser.screenshot_manager import ScreenshotManager
 import logging
 import pytz
-
-
-BASE_DIR = Path(__file__).resolve().parent.parent
-SCREENSHOT_DIR = BASE_DIR / "screenshots"
+import time
 
 
 class ParserBot:
-    def __init__(self, token: str):
+    HISTORY_PAGE_SIZE = 10
+    HISTORY_DEFAULT_DAYS = 7
+    # Ограничение Telegram на callback_data
+    CALLBACK_DATA_LIMIT = 64
+    EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+    def __init__(self, token: str, db: DBManager, started_at: float | None = None):
         self.bot = Bot(token=token)
         self.dp = Dispatcher()
-        self.db = DBManager()
+        self.db = db
         self.logger = logging.getLogger("bot")
+        # content_hash скриншота -> file_id в Telegram (копия таблицы telegram_files)
+        self.file_ids: dict[str, str] = {}
+        self.result_cache = ResultCache(self.db, self._format_result_text)
+        self.send_queue = SendQueue(self.bot)
+        # time.perf_counter() начала запуска - для замера времени до первого ответа
+        self.started_at = started_at
+        self.first_update_handled = False
+        self._stats_task: asyncio.Task | None = None
+
+        if started_at is not None:
+            self.dp.startup.register(self._log_ready)
+            self.dp.update.outer_middleware(self._log_first_update)
 
         self.dp.message(Command("start"))(self.cmd_start)
+        self.dp.message(Command("history"))(self.cmd_history)
+        self.dp.message(Command("stats"))(self.cmd_stats)
         self.dp.message(F.text == "📊 Получить данные")(self.get_message_data)
         self.dp.callback_query(F.data == "get_data")(self.get_data)
         self.dp.callback_query(F.data.startswith("show_screenshot:"))(
@@ -35,6 +64,7 @@ class ParserBot:
         self.dp.callback_query(F.data.startswith("hide_screenshot:"))(
             self.hide_screenshot
         )
+        self.dp.callback_query(F.data.startswith("hist:"))(self.history_page)
 
     async def cmd_start(self, message: types.Message):
         # keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -48,41 +78,152 @@ class ParserBot:
             reply_markup=keyboard,
         )
 
-    async def get_data(self, callback: types.CallbackQuery | None):
-        await callback.answer("⏳ Загружаю данные...")
-
-        results = await self.db.get_latest_results()
+    async def cmd_history(self, message: types.Message, command: CommandObject):
+        args = (command.args or "").split()
 
-        if not results:
-            await callback.message.answer(
-                "⚠️ Нет доступных данных.\nПарсер еще не запускался или все сайты недоступны."
+        # ":" - разделитель в callback_data кнопок истории
+        if not args or ":" in args[0] or (len(args) > 1 and not args[1].isdigit()):
+            await self.send_queue.send_message(
+                message.chat.id,
+                "Использование: /history <сайт> [дней]\nНапример: /history pinco 7",
             )
             return
 
-        for result in results:
-            await self.send_site_data(callback.message, result)
+        site_id = args[0].lower()
+        days = int(args[1]) if len(args) > 1 else self.HISTORY_DEFAULT_DAYS
+
+        text, keyboard = await self._build_history_page(site_id, days)
+        await self.send_queue.send_message(
+            message.chat.id, text, parse_mode="HTML", reply_markup=keyboard
+        )
+
+    async def history_page(self, callback: types.CallbackQuery):
+        try:
+            _, site_id, days, changed_at, change_id = callback.data.split(":")
+            before = None
+            if changed_at:
+                before = (
+                    self.EPOCH + timedelta(microseconds=int(changed_at, 16)),
+                    int(change_id, 16),
+                )
+
+            text, keyboard = await self._build_history_page(site_id, int(days), before)
+            await callback.message.edit_text(
+                text, parse_mode="HTML", reply_markup=keyboard
+            )
+            await callback.answer()
+
+        except Exception as e:
+            self.logger.error(f"Error paging history: {e}")
+            await callback.answer("❌ Ошибка", show_alert=True)
+
+    async def _build_history_page(
+        self, site_id: str, days: int, before: tuple[datetime, int] | None = None
+    ) -> tuple[str, InlineKeyboardMarkup | None]:
+        # Старше DB_RETENTION_DAYS изменений все равно нет
+        days = min(max(1, days), DB_RETENTION_DAYS)
+
+        # Лишняя строка показывает, есть ли следующая страница
+        changes = await self.db.get_method_changes(
+            site_id,
+            since=datetime.now(UTC) - timedelta(days=days),
+            before=before,
+            limit=self.HISTORY_PAGE_SIZE + 1,
+        )
+        page = changes[: self.HISTORY_PAGE_SIZE]
+
+        text = (
+            f"<b>{html.escape(site_id.capitalize())}</b>: изменения за {days} дн.\n\n"
+        )
+
+        if not page:
+            text += "Изменений нет" if before is None else "Больше изменений нет"
+            return text, None
+
+        moscow = pytz.timezone("Europe/Moscow")
+        for change in page:
+            changed_at = change["changed_at"].astimezone(moscow).strftime("%d.%m %H:%M")
+            text += f"{changed_at} {self._format_method_change(change)}\n"
+
+        buttons = []
+        if len(changes) > self.HISTORY_PAGE_SIZE:
+            last = page[-1]
+            micros = (last["changed_at"] - self.EPOCH) // timedelta(microseconds=1)
+            buttons.append(
+                InlineKeyboardButton(
+                    text="Дальше ▶️",
+                    callback_data=f"hist:{site_id}:{days}:{micros:x}:{last['id']:x}",
+                )
+            )
+        if before is not None:
+            buttons.append(
+                InlineKeyboardButton(
+                    text="⏮️ В начало", callback_data=f"hist:{site_id}:{days}::"
+                )
+            )
+
+        buttons = [
+            button
+            for button in buttons
+            if len(button.callback_data.encode()) <= self.CALLBACK_DATA_LIMIT
+        ]
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+        return text, keyboard
+
+    @staticmethod
+    def _format_method_change(change: dict) -> str:
+        # Данные со страниц сайтов, а сообщение уходит с parse_mode="HTML"
+        name = html.escape(change["method_name"])
+        old = html.escape(str(change["old_min_amount"]))
+        new = html.escape(str(change["new_min_amount"]))
+
+        if change["change_type"] == "added":
+            return f"➕ {name}: от {new}₽"
+        if change["change_type"] == "removed":
+            return f"➖ {name} (было от {old}₽)"
+
+        return f"🔄 {name}: {old}₽ → {new}₽"
+
+    async def get_data(self, callback: types.CallbackQuery | None):
+        await callback.answer("⏳ Загружаю данные...")
+        await self.send_results(callback.message)
 
     async def get_message_data(self, message: types.Message):
-        await message.answer("⏳ Загружаю данные...")
+        await self.send_queue.send_message(message.chat.id, "⏳ Загружаю данные...")
+        await self.send_results(message)
 
-        results = await self.db.get_latest_results()
+    async def send_results(self, message: types.Message):
+        results = await self.result_cache.get_latest()
 
         if not results:
-            await message.answer(
-                "⚠️ Нет доступных данных.\nПарсер еще не запускался или все сайты недоступны."
+            await self.send_queue.send_message(
+                message.chat.id,
+                "⚠️ Нет доступных данных.\nПарсер еще не запускался или все сайты недоступны.",
             )
             return
 
-        for result in results:
-            await self.send_site_data(message, result)
+        # Ставим все сообщения в очередь разом, чтобы их можно было склеить
+        await asyncio.gather(
+            *(
+                self.send_site_data(message, result, coalesce=BOT_COALESCE_RESULTS)
+                for result in results
+            )
+        )
 
-    async def send_site_data(self, message: types.Message, result: dict):
-        text = self._format_result_text(result)
+    async def send_site_data(
+        self, message: types.Message, result: dict, coalesce: bool = False
+    ):
+        text = result["text"]
         site_id = result.get("site_id")
-        keyboard = self._create_show_screenshot_keyboard(site_id)
+        keyboard = self._create_show_screenshot_keyboard(
+            site_id, with_site_name=coalesce
+        )
 
-        await message.answer(
+        await self.send_queue.send_message(
+            message.chat.id,
             text,
+            coalesce=coalesce,
             parse_mode="HTML",
             reply_markup=keyboard,
             disable_web_page_preview=True,
@@ -95,21 +236,47 @@ class ParserBot:
             await callback.answer("❌ Данные не найдены", show_alert=True)
             return
 
-        screenshot_path = f"{SCREENSHOT_DIR}/{site_id}/{site_id}.png"
+        result = await self.result_cache.get_site(site_id)
+        screenshot_path = result.get("screenshot_path") if result else None
 
-        if not screenshot_path or not os.path.exists(screenshot_path):
+        if not screenshot_path:
             await callback.answer("❌ Скриншот не найден", show_alert=True)
             return
 
-        try:
-            keyboard = self._create_hide_screenshot_keyboard(site_id)
+        content_hash = ScreenshotManager.get_content_hash(screenshot_path)
 
-            await callback.message.edit_media(
-                media=InputMediaPhoto(
-                    media=FSInputFile(screenshot_path), parse_mode="HTML"
-                ),
-                reply_markup=keyboard,
-            )
+        try:
+            file_id = await self._get_file_id(content_hash)
+
+            if not file_id and not os.path.exists(screenshot_path):
+                await callback.answer("❌ Скриншот не найден", show_alert=True)
+                return
+
+            # Кнопка из склеенного сообщения: там текст и других сайтов
+            reply = callback.data.endswith(":reply")
+            keyboard = self._create_hide_screenshot_keyboard(site_id, reply=reply)
+
+            try:
+                message = await self._show_photo(
+                    callback.message,
+                    file_id or FSInputFile(screenshot_path),
+                    keyboard,
+                    reply,
+                )
+            except TelegramBadRequest:
+                if not file_id:
+                    raise
+
+                # file_id протух на стороне Telegram - загружаем файл заново
+                self.logger.warning(f"Cached file_id rejected for {site_id}")
+                await self._forget_file_id(content_hash)
+                file_id = None
+                message = await self._show_photo(
+                    callback.message, FSInputFile(screenshot_path), keyboard, reply
+                )
+
+            if not file_id and isinstance(message, types.Message) and message.photo:
+                await self._remember_file_id(content_hash, message.photo[-1].file_id)
 
             await callback.answer()
 
@@ -117,10 +284,54 @@ class ParserBot:
             self.logger.error(f"Error showing screenshot: {e}")
             await callback.answer("❌ Ошибка при загрузке скриншота", show_alert=True)
 
+    async def _show_photo(
+        self,
+        message: types.Message,
+        photo,
+        keyboard: InlineKeyboardMarkup,
+        reply: bool,
+    ):
+        # Заменить склеенное сообщение картинкой - потерять данные остальных сайтов
+        if reply:
+            return await message.reply_photo(photo, reply_markup=keyboard)
+
+        return await message.edit_media(
+            media=InputMediaPhoto(media=photo, parse_mode="HTML"),
+            reply_markup=keyboard,
+        )
+
+    async def _get_file_id(self, content_hash: str) -> str | None:
+        file_id = self.file_ids.get(content_hash)
+
+        if file_id is None:
+            file_id = await self.db.get_telegram_file_id(content_hash)
+            if file_id:
+                self.file_ids[content_hash] = file_id
+
+        return file_id
+
+    async def _remember_file_id(self, content_hash: str, file_id: str):
+        self.file_ids[content_hash] = file_id
+        await self.db.save_telegram_file_id(content_hash, file_id)
+
+    async def _forget_file_id(self, content_hash: str):
+        self.file_ids.pop(content_hash, None)
+        await self.db.delete_telegram_file_id(content_hash)
+
     async def hide_screenshot(self, callback: types.CallbackQuery):
         site_id = callback.data.split(":")[1]
 
-        result = await self.db.get_result_by_site_id(site_id)
+        # Скриншот пришел ответом на склеенное сообщение - достаточно его удалить
+        if callback.data.endswith(":reply"):
+            try:
+                await callback.message.delete()
+                await callback.answer()
+            except Exception as e:
+                self.logger.error(f"Error hiding screenshot: {e}")
+                await callback.answer("❌ Ошибка", show_alert=True)
+            return
+
+        result = await self.result_cache.get_site(site_id)
 
         if not result:
             await callback.answer("❌ Данные не найдены", show_alert=True)
@@ -138,10 +349,10 @@ class ParserBot:
     def _format_result_text(self, result: dict) -> str:
         site_name = result["site_id"].capitalize()
         site_url = result["site_url"]
-        parsed_at = (
-            result["parsed_at"]
-            .astimezone(pytz.timezone("Europe/Moscow"))
-            .strftime("%H:%M")
+        # Неизменившиеся данные не пишутся заново - показываем время последней проверки
+        checked_at = result.get("last_checked_at") or result["parsed_at"]
+        parsed_at = checked_at.astimezone(pytz.timezone("Europe/Moscow")).strftime(
+            "%H:%M"
         )
 
         text = f"<b><a href='{site_url}'>{site_name}</a></b> "
@@ -157,24 +368,41 @@ class ParserBot:
 
         return text
 
-    def _create_show_screenshot_keyboard(self, site_id: str) -> InlineKeyboardMarkup:
+    def _create_show_screenshot_keyboard(
+        self, site_id: str, with_site_name: bool = False
+    ) -> InlineKeyboardMarkup:
+        # В склеенном сообщении кнопки разных сайтов должны различаться,
+        # а скриншот приходит ответом, не заменяя сообщение
+        text = "📄 Показать подтверждение"
+        callback_data = f"show_screenshot:{site_id}"
+        if with_site_name:
+            text = f"📄 {site_id.capitalize()}: подтверждение"
+            callback_data += ":reply"
+
         return InlineKeyboardMarkup(
             inline_keyboard=[
                 [
                     InlineKeyboardButton(
-                        text="📄 Показать подтверждение",
-                        callback_data=f"show_screenshot:{site_id}",
+                        text=text,
+                        callback_data=callback_data,
                     )
                 ]
             ]
         )
 
-    def _create_hide_screenshot_keyboard(self, site_id: str) -> InlineKeyboardMarkup:
+    def _create_hide_screenshot_keyboard(
+        self, site_id: str, reply: bool = False
+    ) -> InlineKeyboardMarkup:
+        callback_data = f"hide_screenshot:{site_id}"
+        if reply:
+            callback_data += ":reply"
+
         return InlineKeyboardMarkup(
             inline_keyboard=[
                 [
                     InlineKeyboardButton(
-                        text="◀️ Назад", callback_data=f"hide_screenshot:{site_id}"
+                        text="◀️ Скрыть" if reply else "◀️ Назад",
+                        callback_data=callback_data,
                     )
                 ]
             ]
@@ -187,11 +415,85 @@ class ParserBot:
             resize_keyboard=True,
         )
 
+    async def _log_ready(self):
+        self.logger.info(
+            f"⏱️ Bot is polling {time.perf_counter() - self.started_at:.2f}s after start"
+        )
+
+    async def _log_first_update(self, handler, event, data):
+        if self.first_update_handled:
+            return await handler(event, data)
+
+        self.first_update_handled = True
+        start = time.perf_counter()
+
+        try:
+            return await handler(event, data)
+        finally:
+            now = time.perf_counter()
+            self.logger.info(
+                f"⏱️ First update handled in {now - start:.2f}s, "
+                f"{now - self.started_at:.1f}s after start"
+            )
+
+    def log_stats(self):
+        self.logger.info(
+            f"📈 Result cache: {self.result_cache.get_stats()}, "
+            f"send queue: {self.send_queue.get_stats()}"
+        )
+
+    @staticmethod
+    def _is_admin(message: types.Message) -> bool:
+        if not TELEGRAM_ADMIN_ID or message.from_user is None:
+            return False
+
+        return str(message.from_user.id) == TELEGRAM_ADMIN_ID.strip()
+
+    async def cmd_stats(self, message: types.Message):
+        # Внутренняя статистика бота - только для админа
+        if not self._is_admin(message):
+            self.logger.warning(
+                f"⛔ /stats denied for user "
+                f"{message.from_user.id if message.from_user else None}"
+            )
+            await self.send_queue.send_message(
+                message.chat.id, "⛔ Команда доступна только администратору"
+            )
+            return
+
+        cache, queue = self.result_cache.get_stats(), self.send_queue.get_stats()
+
+        await self.send_queue.send_message(
+            message.chat.id,
+            "📈 Статистика бота\n\n"
+            f"Кэш результатов: попаданий {cache['hits']}, промахов {cache['misses']}, "
+            f"сбросов {cache['invalidations']}, сайтов в кэше {cache['cached']}\n"
+            f"Очередь отправки: в очереди {queue['depth']}, отправлено {queue['sent']}, "
+            f"склеено {queue['coalesced']}, повторов {queue['retries']}, "
+            f"ошибок {queue['failed']}, задержка ср. {queue['latency_avg']}s / "
+            f"макс. {queue['latency_max']}s",
+        )
+
+    async def _log_stats_periodically(self, interval_minutes: int):
+        while True:
+            await asyncio.sleep(interval_minutes * 60)
+            self.log_stats()
+
     async def start_polling(self):
+        if BOT_STATS_INTERVAL_MINUTES > 0:
+            self._stats_task = asyncio.create_task(
+                self._log_stats_periodically(BOT_STATS_INTERVAL_MINUTES)
+            )
+
         await self.bot.delete_webhook(drop_pending_updates=True)
         self.logger.info("🤖 Bot started polling")
         await self.dp.start_polling(self.bot)
 
     async def stop(self):
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+        self.log_stats()
+
+        await self.send_queue.stop()
         await self.bot.session.close()
         self.logger.info("🤖 Bot stopped")
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+from config.settings import RESULT_CACHE_TTL
+
+
+class ResultCache:
+    """Кэш последних результатов по сайтам с заранее отрендеренным текстом сообщения"""
+
+    def __init__(self, db, render, ttl: int = RESULT_CACHE_TTL):
+        self.db = db
+        self.render = render
+        self.ttl = ttl
+        self.logger = logging.getLogger("result_cache")
+
+        self._entries: dict[str, dict] | None = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    async def get_latest(self) -> list[dict]:
+        entries = await self._get_entries()
+        return list(entries.values())
+
+    async def get_site(self, site_id: str) -> dict | None:
+        entries = await self._get_entries()
+        return entries.get(site_id)
+
+    def invalidate(self, site_id: str | None = None):
+        """Сбрасывает кэш; вызывается после коммита save_parse_result"""
+        self._entries = None
+        self._generation += 1
+        self.stats["invalidations"] += 1
+        self.logger.debug(f"Cache invalidated ({site_id or 'all'})")
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "cached": len(self._entries or {})}
+
+    async def _get_entries(self) -> dict[str, dict]:
+        if self._is_fresh():
+            self.stats["hits"] += 1
+            return self._entries
+
+        async with self._lock:
+            # Пока ждали блокировку, кэш мог заполнить другой запрос
+            if self._is_fresh():
+                self.stats["hits"] += 1
+                return self._entries
+
+            self.stats["misses"] += 1
+            generation = self._generation
+            results = await self.db.get_latest_results()
+
+            entries = {}
+            for result in results:
+                row = dict(result)
+                entries[row["site_id"]] = {**row, "text": self.render(row)}
+
+            # Сохранение во время запроса - отдаем прочитанное, но не кэшируем
+            if generation == self._generation:
+                self._entries = entries
+                self._loaded_at = time.monotonic()
+
+            return entries
+
+    def _is_fresh(self) -> bool:
+        if self._entries is None:
+            return False
+
+        return time.monotonic() - self._loaded_at < self.ttl
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+from config.settings import (
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_GROUP_RATE,
+    TELEGRAM_MAX_RETRIES,
+)
+
+# Лимит длины текста сообщения в Telegram
+MESSAGE_LIMIT = 4096
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def delay(self) -> float:
+        """Через сколько секунд будет доступен токен"""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+
+        return wait
+
+    def is_idle(self) -> bool:
+        """Бакет полон и не заблокирован - хранить его незачем"""
+        return self.delay() == 0 and self.tokens >= self.capacity
+
+    def consume(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = time.monotonic() + seconds
+
+
+class OutgoingMessage:
+    def __init__(self, chat_id: int, text: str, coalesce: bool, kwargs: dict):
+        self.chat_id = chat_id
+        self.text = text
+        self.coalesce = coalesce
+        self.kwargs = kwargs
+        self.attempts = 0
+        self.created_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class SendQueue:
+    """Очередь исходящих сообщений с учетом лимитов Telegram на чат и на бота"""
+
+    def __init__(self, bot: Bot, max_retries: int = TELEGRAM_MAX_RETRIES):
+        self.bot = bot
+        self.max_retries = max_retries
+        self.logger = logging.getLogger("send_queue")
+
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.chats: dict[int, deque[OutgoingMessage]] = {}
+
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+
+        self.stats = {
+            "sent": 0,
+            "retries": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def enqueue(
+        self, chat_id: int, text: str, coalesce: bool = False, **kwargs
+    ) -> asyncio.Future:
+        """Ставит сообщение в очередь; future завершится отправленным Message"""
+        message = OutgoingMessage(chat_id, text, coalesce, kwargs)
+        self.chats.setdefault(chat_id, deque()).append(message)
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+        return message.future
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        return await self.enqueue(chat_id, text, **kwargs)
+
+    def get_stats(self) -> dict:
+        sent = self.stats["sent"]
+
+        return {
+            "depth": sum(len(messages) for messages in self.chats.values()),
+            "sent": sent,
+            "retries": self.stats["retries"],
+            "failed": self.stats["failed"],
+            "coalesced": self.stats["coalesced"],
+            "latency_avg": round(self.stats["latency_total"] / sent, 3) if sent else 0,
+            "latency_max": round(self.stats["latency_max"], 3),
+        }
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+        self.logger.info(f"📬 Send queue stopped. Stats: {self.get_stats()}")
+
+    async def _run(self):
+        while True:
+            chat_id, wait = self._next_chat()
+
+            if chat_id is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if wait > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._send_next(chat_id)
+
+    def _next_chat(self) -> tuple[int | None, float]:
+        """Чат, который можно обслужить раньше всех, и сколько до него ждать"""
+        best_chat, best_wait = None, 0.0
+        global_wait = self.global_bucket.delay()
+
+        for chat_id, messages in list(self.chats.items()):
+            if not messages:
+                del self.chats[chat_id]
+                continue
+
+            wait = max(global_wait, self._chat_bucket(chat_id).delay())
+            if best_chat is None or wait < best_wait:
+                best_chat, best_wait = chat_id, wait
+
+        # Бакеты чатов без сообщений, восстановившиеся до полного, не держим в памяти
+        for chat_id in list(self.chat_buckets):
+            if chat_id not in self.chats and self.chat_buckets[chat_id].is_idle():
+                del self.chat_buckets[chat_id]
+
+        return best_chat, best_wait
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            # Группы (отрицательный chat_id) ограничены сильнее личных чатов
+            rate = TELEGRAM_GROUP_RATE if chat_id < 0 else TELEGRAM_CHAT_RATE
+            self.chat_buckets[chat_id] = TokenBucket(rate, TELEGRAM_CHAT_BURST)
+
+        return self.chat_buckets[chat_id]
+
+    async def _send_next(self, chat_id: int):
+        batch = self._take_batch(self.chats[chat_id])
+        head = batch[0]
+
+        text = "\n".join(message.text for message in batch)
+
+        # _take_batch не склеивает сверх лимита, но одно сообщение может быть длиннее
+        if len(text) > MESSAGE_LIMIT:
+            self.logger.error(
+                f"❌ Message to {chat_id} is {len(text)} chars, limit {MESSAGE_LIMIT}"
+            )
+            self._fail(batch, ValueError(f"Message longer than {MESSAGE_LIMIT} chars"))
+            return
+
+        kwargs = dict(head.kwargs)
+        if len(batch) > 1:
+            kwargs["reply_markup"] = self._merge_keyboards(batch)
+            self.stats["coalesced"] += len(batch) - 1
+
+        self.global_bucket.consume()
+        self._chat_bucket(chat_id).consume()
+
+        try:
+            result = await self.bot.send_message(chat_id, text, **kwargs)
+
+        except TelegramRetryAfter as e:
+            self._chat_bucket(chat_id).block(e.retry_after)
+            self.stats["retries"] += 1
+            head.attempts += 1
+
+            if head.attempts > self.max_retries:
+                self._fail(batch, e)
+                return
+
+            self.logger.warning(
+                f"⏳ Flood limit for chat {chat_id}, retry in {e.retry_after}s"
+            )
+            self.chats.setdefault(chat_id, deque()).extendleft(reversed(batch))
+            return
+
+        except Exception as e:
+            self.logger.error(f"❌ Failed to send message to {chat_id}: {e}")
+            self._fail(batch, e)
+            return
+
+        now = time.monotonic()
+        for message in batch:
+            latency = now - message.created_at
+            self.stats["sent"] += 1
+            self.stats["latency_total"] += latency
+            self.stats["latency_max"] = max(self.stats["latency_max"], latency)
+
+            if not message.future.done():
+                message.future.set_result(result)
+
+    def _take_batch(self, messages: deque) -> list[OutgoingMessage]:
+        """Снимает голову очереди чата и склеивает с ней идущие следом сообщения"""
+        batch = [messages.popleft()]
+
+        if not batch[0].coalesce:
+            return batch
+
+        length = len(batch[0].text)
+        while messages and messages[0].coalesce:
+            candidate = messages[0]
+            if length + 1 + len(candidate.text) > MESSAGE_LIMIT:
+                break
+            if candidate.kwargs.get("parse_mode") != batch[0].kwargs.get("parse_mode"):
+                break
+
+            batch.append(messages.popleft())
+            length += 1 + len(candidate.text)
+
+        return batch
+
+    def _merge_keyboards(self, batch: list[OutgoingMessage]):
+        rows = []
+        for message in batch:
+            markup = message.kwargs.get("reply_markup")
+            if isinstance(markup, InlineKeyboardMarkup):
+                rows.extend(markup.inline_keyboard)
+
+        return InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+
+    def _fail(self, batch: list[OutgoingMessage], error: Exception):
+        for message in batch:
+            self.stats["failed"] += 1
+            if not message.future.done():
+                message.future.set_exception(error)
@@ -1,4 +1,5 @@
 import os
+import socket
 import yaml
 from pathlib import Path
 from dotenv import load_dotenv
@@ -15,10 +16,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG_DIR = BASE_DIR / "config"
 SCREENSHOT_PATH = BASE_DIR / "screenshots"
 LOGS_PATH = BASE_DIR / "logs"
+SESSIONS_PATH = BASE_DIR / "sessions"
 
 # Создаем необходимые директории
 SCREENSHOT_PATH.mkdir(exist_ok=True)
 LOGS_PATH.mkdir(exist_ok=True)
+SESSIONS_PATH.mkdir(exist_ok=True)
 
 # ==================== DATABASE ====================
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -32,14 +35,20 @@ DATABASE_URL = (
     f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# Пул соединений: один engine на процесс
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
 # ==================== TELEGRAM ====================
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_ADMIN_ID = os.getenv(
     "TELEGRAM_ADMIN_ID"
 )  # Опционально: для уведомлений админу
-
-if not TELEGRAM_BOT_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN is not set in .env file")
+# Наличие токена проверяет validate_settings() при старте бота и воркера:
+# парсерам и офлайн-бенчмарку он не нужен
 
 # ==================== CAPMONSTER CLOUD ====================
 CAPMONSTER_URL = "https://api.capmonster.cloud"
@@ -50,11 +59,55 @@ CAPMONSTER_KEY = os.getenv("CAPMONSTER_KEY")
 # ==================== PARSER SETTINGS ====================
 PARSE_INTERVAL_HOURS = int(os.getenv("PARSE_INTERVAL_HOURS", "1"))
 SCREENSHOT_RETENTION_DAYS = int(os.getenv("SCREENSHOT_RETENTION_DAYS", "30"))
+# Формат хранения скриншотов: jpeg, webp или png (без перекодирования)
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg")
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+SCREENSHOT_WORKERS = int(os.getenv("SCREENSHOT_WORKERS", "2"))
 DB_RETENTION_DAYS = int(os.getenv("DB_RETENTION_DAYS", "90"))
+# parse_results партиционирована помесячно: сколько партиций создавать наперед
+DB_PARTITION_MONTHS_AHEAD = int(os.getenv("DB_PARTITION_MONTHS_AHEAD", "2"))
+MAINTENANCE_INTERVAL_HOURS = int(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24"))
+PARSE_CONCURRENCY = int(os.getenv("PARSE_CONCURRENCY", "2"))
+# Жесткий дедлайн на парсинг одного сайта (можно переопределить timeout_seconds в sites_config.yaml)
+SITE_PARSE_TIMEOUT = int(os.getenv("SITE_PARSE_TIMEOUT", "180"))
+# Процессы для парсинга (0 - в процессе бота); у каждого свой event loop и браузер
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", "0"))
+# Запас родителя сверх дедлайна сайта: дедлайн соблюдает сам процесс
+PROCESS_DEADLINE_GRACE = int(os.getenv("PROCESS_DEADLINE_GRACE", "30"))
+# Случайный сдвиг старта, чтобы браузеры не запускались одновременно
+SCHEDULE_JITTER_SECONDS = int(os.getenv("SCHEDULE_JITTER_SECONDS", "120"))
+# Во сколько раз интервал может вырасти при ошибках или неизменных данных
+SCHEDULE_MAX_INTERVAL_FACTOR = float(os.getenv("SCHEDULE_MAX_INTERVAL_FACTOR", "4"))
+# Прирост интервала за каждый запуск подряд без изменений
+SCHEDULE_UNCHANGED_STEP = float(os.getenv("SCHEDULE_UNCHANGED_STEP", "0.5"))
+# Как часто проверять изменения sites_config.yaml, секунды (0 - не следить)
+CONFIG_WATCH_INTERVAL = float(os.getenv("CONFIG_WATCH_INTERVAL", "10"))
 
 
 HEADLESS_MODE = os.getenv("HEADLESS_MODE", "true").lower() == "true"
 BROWSER_TIMEOUT = int(os.getenv("BROWSER_TIMEOUT", "30000"))
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+# Сколько контекстов браузер обслуживает до перезапуска
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "50"))
+
+# Сколько ждать условие готовности страницы (readiness в sites_config.yaml), мс
+READINESS_TIMEOUT = int(os.getenv("READINESS_TIMEOUT", "5000"))
+
+# Сколько последних JSON-ответов каждого предиката capture хранить на страницу
+CAPTURE_BUFFER_SIZE = int(os.getenv("CAPTURE_BUFFER_SIZE", "20"))
+
+# Сохраненные сессии (storage_state) и проверка их валидности
+SESSION_MAX_AGE_HOURS = int(os.getenv("SESSION_MAX_AGE_HOURS", "72"))
+SESSION_CHECK_TIMEOUT = int(os.getenv("SESSION_CHECK_TIMEOUT", "7000"))
+
+# Прямые HTTP-запросы к API кассы без браузера (topup.fast_path в sites_config.yaml)
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "true").lower() == "true"
+HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "20"))
+
+# HAR парсера: off, record - записать обмен сайта, replay - прогон из записи без сети
+HAR_MODE = os.getenv("HAR_MODE", "off").lower()
+HAR_PATH = Path(os.getenv("HAR_PATH", BASE_DIR / "hars"))
 
 BROWSER_ARGS = [
     "--disable-blink-features=AutomationControlled",
@@ -80,6 +133,31 @@ CONTEXT_PARAMS = {
     },
 }
 
+# ==================== WORKERS ====================
+# inline - парсинг в процессе бота, queue - задачи в таблице parse_jobs для worker.py
+PARSER_MODE = os.getenv("PARSER_MODE", "inline").lower()
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}:{os.getpid()}")
+# Аренда задачи воркером; продлевается heartbeat каждые JOB_LEASE_SECONDS / 3
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_INTERVAL = int(os.getenv("JOB_POLL_INTERVAL", "5"))
+# Сколько раз задачу с истекшей арендой возвращают в очередь
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# ==================== BOT ====================
+# Страховочный TTL кэша результатов (основная инвалидация - при сохранении)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "600"))
+# Как часто бот пишет в лог статистику кэша и очереди отправки, минуты (0 - не писать)
+BOT_STATS_INTERVAL_MINUTES = int(os.getenv("BOT_STATS_INTERVAL_MINUTES", "15"))
+
+# Лимиты исходящих сообщений (сообщений в секунду)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", "0.33"))
+TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+# Склеивать данные по сайтам в одно сообщение
+BOT_COALESCE_RESULTS = os.getenv("BOT_COALESCE_RESULTS", "false").lower() == "true"
+
 # ==================== LOGGING ====================
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -107,6 +185,10 @@ def setup_logging():
 # ==================== SITES CONFIG ====================
 def load_sites_config() -> List[Dict]:
     """Загружает конфигурацию сайтов из YAML"""
+    from parser.extraction import compile_extractor
+    from parser.readiness import ReadinessWaiter
+    from parser.response_capture import ResponseCapture
+
     config_file = CONFIG_DIR / "sites_config.yaml"
 
     if not config_file.exists():
@@ -138,6 +220,15 @@ def load_sites_config() -> List[Dict]:
 
                         site["credentials"][key] = env_value
 
+            # Правила извлечения компилируются сразу - ошибка в них видна при старте
+            if "extract" in site.get("topup", {}):
+                compile_extractor(site["topup"]["extract"])
+
+            # Условия readiness и имена предикатов capture в response: - тоже
+            ReadinessWaiter(
+                site["id"], site.get("readiness"), ResponseCapture.from_config(site)
+            )
+
         logger.info(f"Loaded {len(sites)} sites from config")
         return sites
 
@@ -179,6 +270,12 @@ def validate_settings():
     if not config_file.exists():
         errors.append(f"Sites config file not found: {config_file}")
 
+    if PARSER_MODE not in ("inline", "queue"):
+        errors.append(f"PARSER_MODE must be inline or queue, got {PARSER_MODE}")
+
+    if HAR_MODE not in ("off", "record", "replay"):
+        errors.append(f"HAR_MODE must be off, record or replay, got {HAR_MODE}")
+
     if errors:
         error_msg = "Configuration errors:\n" + "\n".join(f"  - {e}" for e in errors)
         raise ValueError(error_msg)
@@ -192,7 +289,13 @@ __all__ = [
     "CONFIG_DIR",
     "SCREENSHOT_PATH",
     "LOGS_PATH",
+    "SESSIONS_PATH",
     "DATABASE_URL",
+    "DB_POOL_SIZE",
+    "DB_MAX_OVERFLOW",
+    "DB_POOL_TIMEOUT",
+    "DB_POOL_RECYCLE",
+    "DB_STATEMENT_CACHE_SIZE",
     "TELEGRAM_BOT_TOKEN",
     "TELEGRAM_ADMIN_ID",
     "CAPMONSTER_URL",
@@ -201,11 +304,48 @@ __all__ = [
     "CAPMONSTER_KEY",
     "PARSE_INTERVAL_HOURS",
     "SCREENSHOT_RETENTION_DAYS",
+    "SCREENSHOT_FORMAT",
+    "SCREENSHOT_QUALITY",
+    "SCREENSHOT_WORKERS",
     "DB_RETENTION_DAYS",
+    "DB_PARTITION_MONTHS_AHEAD",
+    "MAINTENANCE_INTERVAL_HOURS",
+    "PARSE_CONCURRENCY",
+    "SITE_PARSE_TIMEOUT",
+    "PARSE_PROCESSES",
+    "PROCESS_DEADLINE_GRACE",
+    "SCHEDULE_JITTER_SECONDS",
+    "SCHEDULE_MAX_INTERVAL_FACTOR",
+    "SCHEDULE_UNCHANGED_STEP",
+    "CONFIG_WATCH_INTERVAL",
     "HEADLESS_MODE",
     "BROWSER_TIMEOUT",
+    "BROWSER_POOL_SIZE",
+    "BROWSER_MAX_CONTEXTS",
+    "READINESS_TIMEOUT",
+    "CAPTURE_BUFFER_SIZE",
+    "SESSION_MAX_AGE_HOURS",
+    "SESSION_CHECK_TIMEOUT",
+    "HTTP_FAST_PATH",
+    "HTTP_TIMEOUT",
+    "HTTP_POOL_LIMIT",
+    "HAR_MODE",
+    "HAR_PATH",
     "BROWSER_ARGS",
     "CONTEXT_PARAMS",
+    "PARSER_MODE",
+    "WORKER_ID",
+    "JOB_LEASE_SECONDS",
+    "JOB_POLL_INTERVAL",
+    "JOB_MAX_ATTEMPTS",
+    "RESULT_CACHE_TTL",
+    "BOT_STATS_INTERVAL_MINUTES",
+    "TELEGRAM_GLOBAL_RATE",
+    "TELEGRAM_CHAT_RATE",
+    "TELEGRAM_GROUP_RATE",
+    "TELEGRAM_CHAT_BURST",
+    "TELEGRAM_MAX_RETRIES",
+    "BOT_COALESCE_RESULTS",
     "LOG_LEVEL",
     "LOG_FORMAT",
     "LOG_FILE",
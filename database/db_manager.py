@@ -1,85 +1,592 @@
+import json
+from datetime import datetime, timedelta, UTC
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy import update, select, and_
-from database.models import Base, ParseResult
-from config.settings import DATABASE_URL
+from sqlalchemy import select, delete, func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from database.hashing import payment_methods_hash
+from database.job_queue import JobQueue
+from database.models import (
+    Base,
+    ParseTiming,
+    PaymentMethodChange,
+    SiteLatest,
+    TelegramFile,
+)
+from database.partitions import PartitionManager
+from database.pool import InstrumentedPool
+from config.settings import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_RETENTION_DAYS,
+    DB_STATEMENT_CACHE_SIZE,
+)
 import logging
 
 
+# Колонки, добавленные после первого релиза: create_all не меняет существующие таблицы
+SCHEMA_MIGRATIONS = [
+    "ALTER TABLE IF EXISTS parse_results ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE IF EXISTS parse_results ADD COLUMN IF NOT EXISTS last_checked_at TIMESTAMP WITH TIME ZONE",
+]
+
+
+# Ключ advisory-блокировки схемы: DDL init_db выполняет один процесс за раз
+SCHEMA_LOCK_KEY = 7_310_001
+
+
+# Заполняет site_latest из parse_results при переходе на новую схему
+SEED_SITE_LATEST_SQL = """
+INSERT INTO site_latest (
+    site_id, result_id, status, payment_methods, site_url, screenshot_path,
+    content_hash, parsed_at, last_checked_at, error_message
+)
+SELECT DISTINCT ON (site_id)
+    site_id, id, status, payment_methods, site_url, screenshot_path,
+    content_hash, parsed_at, last_checked_at, error_message
+FROM parse_results
+WHERE is_latest
+ORDER BY site_id, parsed_at DESC
+ON CONFLICT (site_id) DO NOTHING
+"""
+
+# Сохранение результатов цикла одним запросом:
+# неизменившиеся сайты только обновляют last_checked_at, изменившиеся пишут
+# новую строку в parse_results, site_latest обновляется через ON CONFLICT.
+# Для изменившихся успешных результатов там же пишутся изменения методов
+# относительно прошлого успешного снимка (payment_method_changes)
+SAVE_RESULTS_SQL = """
+WITH incoming AS (
+    SELECT *
+    FROM jsonb_to_recordset(CAST(:batch AS jsonb)) AS i(
+        site_id text,
+        status text,
+        payment_methods jsonb,
+        site_url text,
+        screenshot_path text,
+        content_hash text,
+        checked_at timestamptz,
+        error_message text
+    )
+),
+unchanged AS (
+    SELECT
+        i.site_id,
+        l.result_id,
+        l.parsed_at,
+        COALESCE(i.screenshot_path, l.screenshot_path) AS screenshot_path
+    FROM incoming i
+    JOIN site_latest l ON l.site_id = i.site_id
+    WHERE i.status = 'success'
+      AND l.status = 'success'
+      AND l.content_hash = i.content_hash
+),
+changed AS (
+    SELECT i.*
+    FROM incoming i
+    WHERE NOT EXISTS (SELECT 1 FROM unchanged u WHERE u.site_id = i.site_id)
+),
+demoted AS (
+    -- parsed_at из site_latest: без него UPDATE обходит все партиции parse_results
+    UPDATE parse_results r
+    SET is_latest = false
+    FROM changed c
+    JOIN site_latest l ON l.site_id = c.site_id
+    WHERE r.site_id = c.site_id
+      AND r.id = l.result_id
+      AND r.parsed_at = l.parsed_at
+      AND r.is_latest
+),
+inserted AS (
+    INSERT INTO parse_results (
+        site_id, status, payment_methods, site_url, screenshot_path,
+        is_latest, parsed_at, error_message, content_hash, last_checked_at
+    )
+    SELECT
+        site_id, status, COALESCE(payment_methods, '[]'::jsonb), site_url,
+        screenshot_path, true, checked_at, error_message, content_hash, checked_at
+    FROM changed
+    RETURNING id, site_id
+),
+touched AS (
+    UPDATE parse_results r
+    SET last_checked_at = i.checked_at, screenshot_path = u.screenshot_path
+    FROM unchanged u
+    JOIN incoming i ON i.site_id = u.site_id
+    WHERE r.id = u.result_id
+      AND r.site_id = u.site_id
+      AND r.parsed_at = u.parsed_at
+),
+previous AS (
+    -- Последний успешный снимок: после ошибки site_latest хранит пустой список
+    SELECT c.site_id, p.payment_methods
+    FROM changed c
+    CROSS JOIN LATERAL (
+        SELECT r.payment_methods
+        FROM parse_results r
+        WHERE r.site_id = c.site_id
+          AND r.status = 'success'
+          AND jsonb_typeof(r.payment_methods) = 'array'
+        ORDER BY r.parsed_at DESC
+        LIMIT 1
+    ) p
+    WHERE c.status = 'success' AND jsonb_typeof(c.payment_methods) = 'array'
+),
+old_methods AS (
+    SELECT DISTINCT ON (p.site_id, m.value->>'method_name')
+        p.site_id, m.value->>'method_name' AS method_name, m.value->'min_amount' AS min_amount
+    FROM previous p
+    CROSS JOIN LATERAL jsonb_array_elements(p.payment_methods) WITH ORDINALITY AS m(value, n)
+    ORDER BY p.site_id, m.value->>'method_name', m.n
+),
+new_methods AS (
+    -- Без прошлого снимка сравнивать не с чем: первый результат сайта изменений не дает
+    SELECT DISTINCT ON (c.site_id, m.value->>'method_name')
+        c.site_id, m.value->>'method_name' AS method_name, m.value->'min_amount' AS min_amount
+    FROM changed c
+    JOIN previous p ON p.site_id = c.site_id
+    CROSS JOIN LATERAL jsonb_array_elements(c.payment_methods) WITH ORDINALITY AS m(value, n)
+    ORDER BY c.site_id, m.value->>'method_name', m.n
+),
+method_changes AS (
+    INSERT INTO payment_method_changes (
+        site_id, result_id, method_name, change_type,
+        old_min_amount, new_min_amount, changed_at
+    )
+    SELECT
+        c.site_id,
+        ins.id,
+        COALESCE(n.method_name, o.method_name),
+        CASE
+            WHEN o.method_name IS NULL THEN 'added'
+            WHEN n.method_name IS NULL THEN 'removed'
+            ELSE 'min_changed'
+        END,
+        o.min_amount,
+        n.min_amount,
+        c.checked_at
+    FROM new_methods n
+    FULL JOIN old_methods o
+        ON o.site_id = n.site_id AND o.method_name = n.method_name
+    JOIN changed c ON c.site_id = COALESCE(n.site_id, o.site_id)
+    JOIN inserted ins ON ins.site_id = c.site_id
+    WHERE o.method_name IS NULL
+       OR n.method_name IS NULL
+       OR o.min_amount IS DISTINCT FROM n.min_amount
+    RETURNING site_id
+),
+upserted AS (
+    INSERT INTO site_latest (
+        site_id, result_id, status, payment_methods, site_url, screenshot_path,
+        content_hash, parsed_at, last_checked_at, error_message
+    )
+    SELECT
+        i.site_id,
+        COALESCE(ins.id, u.result_id),
+        i.status,
+        COALESCE(i.payment_methods, '[]'::jsonb),
+        i.site_url,
+        CASE WHEN u.site_id IS NULL THEN i.screenshot_path ELSE u.screenshot_path END,
+        i.content_hash,
+        COALESCE(u.parsed_at, i.checked_at),
+        i.checked_at,
+        i.error_message
+    FROM incoming i
+    LEFT JOIN inserted ins ON ins.site_id = i.site_id
+    LEFT JOIN unchanged u ON u.site_id = i.site_id
+    ON CONFLICT (site_id) DO UPDATE SET
+        result_id = EXCLUDED.result_id,
+        status = EXCLUDED.status,
+        payment_methods = EXCLUDED.payment_methods,
+        site_url = EXCLUDED.site_url,
+        screenshot_path = EXCLUDED.screenshot_path,
+        content_hash = EXCLUDED.content_hash,
+        parsed_at = EXCLUDED.parsed_at,
+        last_checked_at = EXCLUDED.last_checked_at,
+        error_message = EXCLUDED.error_message
+    RETURNING site_id, result_id
+)
+SELECT
+    up.site_id,
+    up.result_id,
+    (u.site_id IS NULL) AS changed,
+    (SELECT count(*) FROM method_changes mc WHERE mc.site_id = up.site_id) AS method_changes
+FROM upserted up
+LEFT JOIN unchanged u ON u.site_id = up.site_id
+"""
+
+
 class DBManager:
+    """Слой данных процесса: создается один раз в main.py и передается компонентам"""
+
     def __init__(self):
-        self.engine = create_async_engine(DATABASE_URL, echo=False)
+        self.engine = create_async_engine(
+            DATABASE_URL,
+            echo=False,
+            poolclass=InstrumentedPool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        )
         self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.partitions = PartitionManager()
+        self.jobs = JobQueue()
         self.logger = logging.getLogger("db_manager")
+        # Колбэки site_id -> None, вызываются после коммита результата
+        self.save_listeners = []
+
+    def get_pool_stats(self) -> dict:
+        pool = self.engine.sync_engine.pool
+        stats = dict(pool.checkout_stats)
+        checkouts = stats["checkouts"]
+
+        stats["wait_avg"] = stats["wait_total"] / checkouts if checkouts else 0.0
+        stats["checked_out"] = pool.checkedout()
+        stats["size"] = pool.size()
+        stats["overflow"] = pool.overflow()
+
+        return stats
+
+    async def close(self):
+        await self.engine.dispose()
+
+    def add_save_listener(self, callback):
+        self.save_listeners.append(callback)
+
+    def _notify_saved(self, site_id: str):
+        for callback in self.save_listeners:
+            try:
+                callback(site_id)
+            except Exception as e:
+                self.logger.error(f"Error in save listener: {e}")
 
     async def init_db(self):
+        """Создает и мигрирует схему; вызывается только из main.py"""
         async with self.engine.begin() as conn:
+            # Второй main.py, запущенный одновременно, дождется конца миграции
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY}
+            )
+
+            for statement in SCHEMA_MIGRATIONS:
+                await conn.execute(text(statement))
+
+            has_legacy = await self.partitions.prepare_legacy(conn)
+
             # await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
+
+            await self.partitions.ensure_partitions(conn)
+            if has_legacy:
+                await self.partitions.migrate_legacy(conn)
+
+            await conn.execute(text(SEED_SITE_LATEST_SQL))
         self.logger.info("Database initialized")
 
-    async def save_parse_result(self, result: dict):
-        async with self.async_session() as session:
-            try:
-                site_id = result["site_id"]
+    async def verify_schema(self):
+        """Проверяет, что схему уже создал main.py; воркеры DDL не выполняют"""
+        async with self.engine.begin() as conn:
+            # Если main.py сейчас мигрирует схему - ждем окончания
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock_shared(:key)"),
+                {"key": SCHEMA_LOCK_KEY},
+            )
 
-                stmt = (
-                    update(ParseResult)
-                    .where(and_(ParseResult.site_id == site_id, ParseResult.is_latest))
-                    .values(is_latest=False)
+            missing = []
+            for table in Base.metadata.sorted_tables:
+                exists = await conn.scalar(
+                    text("SELECT to_regclass(:table) IS NOT NULL"),
+                    {"table": table.name},
                 )
-                await session.execute(stmt)
-
-                parse_result = ParseResult(
-                    site_id=site_id,
-                    status=result.get("status"),
-                    payment_methods=result.get("payment_methods"),
-                    site_url=result.get("site_url"),
-                    screenshot_path=result.get("screenshot_path"),
-                    is_latest=True,
-                    parsed_at=result.get("parsed_at"),
-                    error_message=result.get("error_message"),
+                if not exists:
+                    missing.append(table.name)
+
+        if missing:
+            raise RuntimeError(
+                f"Database schema is not initialized (missing: {', '.join(missing)}). "
+                "Start main.py first"
+            )
+
+        self.logger.info("Database schema verified")
+
+    async def run_maintenance(self):
+        """Создает партиции на будущее и удаляет просроченные (DB_RETENTION_DAYS)"""
+        async with self.engine.begin() as conn:
+            await self.partitions.ensure_partitions(conn)
+            dropped = await self.partitions.drop_expired(conn)
+            deleted_jobs = await self.jobs.delete_old(conn)
+            deleted_timings = await conn.execute(
+                delete(ParseTiming).where(
+                    ParseTiming.recorded_at
+                    < datetime.now(UTC) - timedelta(days=DB_RETENTION_DAYS)
                 )
-                session.add(parse_result)
-                await session.commit()
+            )
+            deleted_changes = await conn.execute(
+                delete(PaymentMethodChange).where(
+                    PaymentMethodChange.changed_at
+                    < datetime.now(UTC) - timedelta(days=DB_RETENTION_DAYS)
+                )
+            )
 
-                self.logger.info(
-                    f"✅ Saved result for {site_id} (ID: {parse_result.id})"
+        if dropped:
+            self.logger.info(f"🧹 Dropped expired partitions: {', '.join(dropped)}")
+        else:
+            self.logger.info("🧹 No expired partitions to drop")
+
+        if deleted_jobs:
+            self.logger.info(f"🧹 Deleted {deleted_jobs} finished parse jobs")
+        if deleted_timings.rowcount:
+            self.logger.info(f"🧹 Deleted {deleted_timings.rowcount} parse timings")
+        if deleted_changes.rowcount:
+            self.logger.info(
+                f"🧹 Deleted {deleted_changes.rowcount} payment method changes"
+            )
+
+    async def enqueue_job(self, site_id: str, delay: float = 0) -> int | None:
+        async with self.engine.begin() as conn:
+            return await self.jobs.enqueue(conn, site_id, delay)
+
+    async def claim_job(self, worker_id: str) -> dict | None:
+        async with self.engine.begin() as conn:
+            return await self.jobs.claim(conn, worker_id)
+
+    async def heartbeat_job(self, job_id: int, worker_id: str) -> bool:
+        async with self.engine.begin() as conn:
+            return await self.jobs.heartbeat(conn, job_id, worker_id)
+
+    async def finish_job(self, job_id: int, worker_id: str, result: dict) -> bool:
+        async with self.engine.begin() as conn:
+            return await self.jobs.finish(
+                conn,
+                job_id,
+                worker_id,
+                result.get("status"),
+                result.get("changed"),
+                result.get("error_message"),
+            )
+
+    async def requeue_expired_jobs(self) -> list[dict]:
+        async with self.engine.begin() as conn:
+            return await self.jobs.requeue_expired(conn)
+
+    async def pop_finished_jobs(self) -> list[dict]:
+        """Итоги задач воркеров; результат сохранен другим процессом - сбрасываем кэши"""
+        async with self.engine.begin() as conn:
+            jobs = await self.jobs.pop_finished(conn)
+
+        for job in jobs:
+            if job["status"] == "done":
+                self._notify_saved(job["site_id"])
+
+        return jobs
+
+    async def save_parse_result(self, result: dict) -> bool:
+        """Сохраняет результат; возвращает False, если данные не изменились"""
+        (saved,) = await self.save_parse_results([result])
+        return saved["changed"]
+
+    async def save_parse_results(self, results: list[dict]) -> list[dict]:
+        """Сохраняет результаты цикла одной транзакцией и одним запросом"""
+        # В одном INSERT ... ON CONFLICT сайт может встретиться только раз
+        batch = {}
+        for result in results:
+            batch[result["site_id"]] = self._serialize_result(result)
+
+        if not batch:
+            return []
+
+        async with self.async_session() as session:
+            try:
+                rows = await session.execute(
+                    text(SAVE_RESULTS_SQL),
+                    {"batch": json.dumps(list(batch.values()), ensure_ascii=False)},
                 )
+                saved = [dict(row) for row in rows.mappings()]
+                await session.commit()
 
             except Exception as e:
                 await session.rollback()
-                self.logger.error(f"❌ Error saving result: {e}")
+                self.logger.error(f"❌ Error saving results: {e}")
                 raise
 
+        for row in saved:
+            if row["changed"]:
+                self.logger.info(
+                    f"✅ Saved result for {row['site_id']} (ID: {row['result_id']}, "
+                    f"method changes: {row['method_changes']})"
+                )
+            else:
+                self.logger.info(
+                    f"⏭️ Result for {row['site_id']} unchanged (ID: {row['result_id']})"
+                )
+            self._notify_saved(row["site_id"])
+
+        return saved
+
+    async def save_parse_timings(self, rows: list[dict]):
+        """rows: cycle_id, site_id, parse_result_id, stage, seconds"""
+        if not rows:
+            return
+
+        async with self.async_session() as session:
+            await session.execute(insert(ParseTiming), rows)
+            await session.commit()
+
+    async def get_stage_percentiles(
+        self, days: int = 7, period: str = "day", site_id: str | None = None
+    ) -> list[dict]:
+        """p50/p95 длительности стадий по сайтам за период (period - для date_trunc)"""
+        bucket = func.date_trunc(period, ParseTiming.recorded_at).label("period")
+
+        query = (
+            select(
+                ParseTiming.site_id,
+                ParseTiming.stage,
+                bucket,
+                func.count().label("runs"),
+                func.percentile_cont(0.5)
+                .within_group(ParseTiming.seconds)
+                .label("p50"),
+                func.percentile_cont(0.95)
+                .within_group(ParseTiming.seconds)
+                .label("p95"),
+            )
+            .where(ParseTiming.recorded_at >= datetime.now(UTC) - timedelta(days=days))
+            # По имени колонки: повтор выражения дал бы в GROUP BY другой параметр
+            .group_by(ParseTiming.site_id, ParseTiming.stage, "period")
+            .order_by(ParseTiming.site_id, ParseTiming.stage, "period")
+        )
+
+        if site_id:
+            query = query.where(ParseTiming.site_id == site_id)
+
+        async with self.async_session() as session:
+            result = await session.execute(query)
+            return [dict(row) for row in result.mappings()]
+
+    def _serialize_result(self, result: dict) -> dict:
+        content_hash = None
+        if result.get("status") == "success":
+            content_hash = payment_methods_hash(result.get("payment_methods"))
+
+        checked_at = result.get("parsed_at") or datetime.now(UTC)
+
+        return {
+            "site_id": result["site_id"],
+            "status": result.get("status"),
+            "payment_methods": result.get("payment_methods"),
+            "site_url": result.get("site_url"),
+            "screenshot_path": result.get("screenshot_path"),
+            "content_hash": content_hash,
+            "checked_at": checked_at.isoformat(),
+            "error_message": result.get("error_message"),
+        }
+
     async def get_latest_results(self):
         async with self.async_session() as session:
             query = select(
-                ParseResult.id,
-                ParseResult.site_id,
-                ParseResult.payment_methods,
-                ParseResult.site_url,
-                ParseResult.parsed_at,
-                ParseResult.screenshot_path,
-            ).where(ParseResult.is_latest)
+                SiteLatest.result_id.label("id"),
+                SiteLatest.site_id,
+                SiteLatest.payment_methods,
+                SiteLatest.site_url,
+                SiteLatest.parsed_at,
+                SiteLatest.last_checked_at,
+                SiteLatest.screenshot_path,
+            ).order_by(SiteLatest.site_id)
             result = await session.execute(query)
 
             return result.mappings().all()
 
-    async def get_result_by_site_id(self, site_id: str):
+    async def get_content_hashes(self) -> dict[str, str]:
+        """content_hash последних успешных результатов по сайтам"""
         async with self.async_session() as session:
-            query = select(
-                ParseResult.id,
-                ParseResult.site_id,
-                ParseResult.payment_methods,
-                ParseResult.site_url,
-                ParseResult.parsed_at,
-                ParseResult.screenshot_path,
-            ).where(
-                and_(
-                    ParseResult.is_latest,
-                    ParseResult.site_id == site_id,
+            result = await session.execute(
+                select(SiteLatest.site_id, SiteLatest.content_hash).where(
+                    SiteLatest.status == "success"
                 )
             )
+
+            return {row.site_id: row.content_hash for row in result}
+
+    async def get_result_by_site_id(self, site_id: str):
+        async with self.async_session() as session:
+            query = select(
+                SiteLatest.result_id.label("id"),
+                SiteLatest.site_id,
+                SiteLatest.payment_methods,
+                SiteLatest.site_url,
+                SiteLatest.parsed_at,
+                SiteLatest.last_checked_at,
+                SiteLatest.screenshot_path,
+            ).where(SiteLatest.site_id == site_id)
             result = await session.execute(query)
 
             return result.mappings().one_or_none()
+
+    async def get_method_changes(
+        self,
+        site_id: str,
+        since: datetime,
+        before: tuple[datetime, int] | None = None,
+        limit: int = 10,
+    ) -> list[dict]:
+        """Изменения методов сайта от новых к старым; before - (changed_at, id) курсора"""
+        query = select(
+            PaymentMethodChange.id,
+            PaymentMethodChange.method_name,
+            PaymentMethodChange.change_type,
+            PaymentMethodChange.old_min_amount,
+            PaymentMethodChange.new_min_amount,
+            PaymentMethodChange.changed_at,
+        ).where(
+            PaymentMethodChange.site_id == site_id,
+            PaymentMethodChange.changed_at >= since,
+        )
+
+        # Keyset вместо OFFSET: страница читается по индексу с места курсора
+        if before is not None:
+            query = query.where(
+                tuple_(PaymentMethodChange.changed_at, PaymentMethodChange.id)
+                < tuple_(*before)
+            )
+
+        query = query.order_by(
+            PaymentMethodChange.changed_at.desc(), PaymentMethodChange.id.desc()
+        ).limit(limit)
+
+        async with self.async_session() as session:
+            result = await session.execute(query)
+
+            return [dict(row) for row in result.mappings()]
+
+    async def get_telegram_file_id(self, content_hash: str) -> str | None:
+        async with self.async_session() as session:
+            return await session.scalar(
+                select(TelegramFile.file_id).where(
+                    TelegramFile.content_hash == content_hash
+                )
+            )
+
+    async def save_telegram_file_id(self, content_hash: str, file_id: str):
+        async with self.async_session() as session:
+            stmt = insert(TelegramFile).values(
+                content_hash=content_hash, file_id=file_id
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TelegramFile.content_hash],
+                set_={"file_id": stmt.excluded.file_id},
+            )
+            await session.execute(stmt)
+            await session.commit()
+
+    async def delete_telegram_file_id(self, content_hash: str):
+        async with self.async_session() as session:
+            await session.execute(
+                delete(TelegramFile).where(TelegramFile.content_hash == content_hash)
+            )
+            await session.commit()
@@ -0,0 +1,14 @@
+import hashlib
+import json
+
+
+def payment_methods_hash(payment_methods) -> str | None:
+    """Стабильный хэш списка методов: не зависит от порядка ключей и форматирования"""
+    if payment_methods is None:
+        return None
+
+    payload = json.dumps(
+        payment_methods, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
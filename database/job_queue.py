@@ -0,0 +1,159 @@
+import logging
+from datetime import timedelta
+from sqlalchemy import text
+from config.settings import DB_RETENTION_DAYS, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+
+
+# Повторная постановка сайта, у которого уже есть активная задача, ничего не делает
+ENQUEUE_SQL = """
+INSERT INTO parse_jobs (site_id, run_after)
+VALUES (:site_id, now() + CAST(:delay AS interval))
+ON CONFLICT (site_id) WHERE status IN ('queued', 'running') DO NOTHING
+RETURNING id
+"""
+
+# SKIP LOCKED: воркеры на разных хостах не ждут друг друга и не берут одну задачу
+CLAIM_SQL = """
+UPDATE parse_jobs j
+SET status = 'running',
+    worker_id = :worker_id,
+    attempts = j.attempts + 1,
+    started_at = now(),
+    heartbeat_at = now(),
+    lease_until = now() + CAST(:lease AS interval)
+FROM (
+    SELECT id
+    FROM parse_jobs
+    WHERE status = 'queued' AND run_after <= now()
+    ORDER BY run_after
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+) next_job
+WHERE j.id = next_job.id
+RETURNING j.id, j.site_id, j.attempts
+"""
+
+HEARTBEAT_SQL = """
+UPDATE parse_jobs
+SET heartbeat_at = now(), lease_until = now() + CAST(:lease AS interval)
+WHERE id = :job_id AND worker_id = :worker_id AND status = 'running'
+RETURNING id
+"""
+
+FINISH_SQL = """
+UPDATE parse_jobs
+SET status = 'done',
+    finished_at = now(),
+    lease_until = NULL,
+    result_status = :result_status,
+    changed = :changed,
+    error_message = :error_message
+WHERE id = :job_id AND worker_id = :worker_id AND status = 'running'
+RETURNING id
+"""
+
+# Воркер пропал, не дописав задачу: возвращаем ее в очередь или сдаемся
+REQUEUE_EXPIRED_SQL = """
+UPDATE parse_jobs
+SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+    finished_at = CASE WHEN attempts >= :max_attempts THEN now() END,
+    error_message = 'Lease of ' || worker_id || ' expired',
+    worker_id = NULL,
+    lease_until = NULL,
+    run_after = now()
+WHERE status = 'running' AND lease_until < now()
+RETURNING id, site_id, status
+"""
+
+POP_FINISHED_SQL = """
+UPDATE parse_jobs
+SET reported = true
+WHERE status IN ('done', 'failed') AND NOT reported
+RETURNING id, site_id, status, result_status, changed, error_message
+"""
+
+DELETE_OLD_SQL = """
+DELETE FROM parse_jobs
+WHERE status IN ('done', 'failed') AND reported AND finished_at < now() - CAST(:retention AS interval)
+"""
+
+
+class JobQueue:
+    """Очередь parse_jobs в Postgres: постановка, аренда задач воркерами, итоги"""
+
+    def __init__(
+        self,
+        lease_seconds: int = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retention_days: int = DB_RETENTION_DAYS,
+    ):
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retention = timedelta(days=retention_days)
+        self.logger = logging.getLogger("job_queue")
+
+    async def enqueue(self, conn, site_id: str, delay: float = 0) -> int | None:
+        """Ставит задачу; None, если по сайту уже есть активная задача"""
+        return await conn.scalar(
+            text(ENQUEUE_SQL),
+            {"site_id": site_id, "delay": timedelta(seconds=delay)},
+        )
+
+    async def claim(self, conn, worker_id: str) -> dict | None:
+        result = await conn.execute(
+            text(CLAIM_SQL), {"worker_id": worker_id, "lease": self.lease}
+        )
+        row = result.mappings().one_or_none()
+
+        return dict(row) if row else None
+
+    async def heartbeat(self, conn, job_id: int, worker_id: str) -> bool:
+        """Продлевает аренду; False - задачу уже забрали у воркера"""
+        renewed = await conn.scalar(
+            text(HEARTBEAT_SQL),
+            {"job_id": job_id, "worker_id": worker_id, "lease": self.lease},
+        )
+        return renewed is not None
+
+    async def finish(
+        self,
+        conn,
+        job_id: int,
+        worker_id: str,
+        result_status: str | None,
+        changed: bool | None,
+        error_message: str | None,
+    ) -> bool:
+        finished = await conn.scalar(
+            text(FINISH_SQL),
+            {
+                "job_id": job_id,
+                "worker_id": worker_id,
+                "result_status": result_status,
+                "changed": changed,
+                "error_message": error_message,
+            },
+        )
+        return finished is not None
+
+    async def requeue_expired(self, conn) -> list[dict]:
+        result = await conn.execute(
+            text(REQUEUE_EXPIRED_SQL), {"max_attempts": self.max_attempts}
+        )
+        rows = [dict(row) for row in result.mappings()]
+
+        for row in rows:
+            self.logger.warning(
+                f"⌛ Lease of job {row['id']} ({row['site_id']}) expired -> {row['status']}"
+            )
+
+        return rows
+
+    async def pop_finished(self, conn) -> list[dict]:
+        """Завершенные задачи, о которых планировщик еще не знает"""
+        result = await conn.execute(text(POP_FINISHED_SQL))
+        return [dict(row) for row in result.mappings()]
+
+    async def delete_old(self, conn) -> int:
+        result = await conn.execute(text(DELETE_OLD_SQL), {"retention": self.retention})
+        return result.rowcount
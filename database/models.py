@@ -1,5 +1,15 @@
 from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped
-from sqlalchemy import Integer, String, DateTime, Boolean, func, Index, Text, text
+from sqlalchemy import (
+    Integer,
+    String,
+    DateTime,
+    Boolean,
+    Float,
+    func,
+    Index,
+    Text,
+    text,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
@@ -11,7 +21,8 @@ class Base(DeclarativeBase):
 class ParseResult(Base):
     __tablename__ = "parse_results"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # parsed_at входит в первичный ключ: таблица партиционирована по нему помесячно
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     site_id: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     status: Mapped[str] = mapped_column(String(20), nullable=False)
     payment_methods: Mapped[dict] = mapped_column(JSONB, default=dict)
@@ -21,11 +32,142 @@ class ParseResult(Base):
         Boolean, server_default=text("true"), nullable=False, index=True
     )
     parsed_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), index=True
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True
     )
     error_message: Mapped[str] = mapped_column(Text, nullable=True)
+    # Хэш payment_methods: неизменившийся результат не пишется новой строкой
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
+    last_checked_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     __table_args__ = (
         Index("ix_site_latest", "site_id", "is_latest"),
         Index("ix_site_date", "site_id", "parsed_at"),
+        {"postgresql_partition_by": "RANGE (parsed_at)"},
+    )
+
+
+class SiteLatest(Base):
+    """Последний результат по каждому сайту: читается ботом вместо parse_results"""
+
+    __tablename__ = "site_latest"
+
+    site_id: Mapped[str] = mapped_column(String(50), primary_key=True)
+    result_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    payment_methods: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    site_url: Mapped[str] = mapped_column(Text, nullable=True)
+    screenshot_path: Mapped[str] = mapped_column(String(255), nullable=True)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
+    # parsed_at строки result_id - ключ партиции, по нему UPDATE попадает в одну партицию
+    parsed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_checked_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    error_message: Mapped[str] = mapped_column(Text, nullable=True)
+
+
+class TelegramFile(Base):
+    """file_id загруженных в Telegram скриншотов по хэшу содержимого"""
+
+    __tablename__ = "telegram_files"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    file_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class ParseJob(Base):
+    """Очередь задач на парсинг сайта для воркеров (PARSER_MODE=queue)"""
+
+    __tablename__ = "parse_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    # queued -> running -> done; failed - аренда истекла JOB_MAX_ATTEMPTS раз
+    status: Mapped[str] = mapped_column(
+        String(20), server_default=text("'queued'"), nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, server_default=text("0"), nullable=False
+    )
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    worker_id: Mapped[str] = mapped_column(String(255), nullable=True)
+    lease_until: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    heartbeat_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Исход парсинга для планировщика: status результата и изменились ли данные
+    result_status: Mapped[str] = mapped_column(String(20), nullable=True)
+    changed: Mapped[bool] = mapped_column(Boolean, nullable=True)
+    error_message: Mapped[str] = mapped_column(Text, nullable=True)
+    reported: Mapped[bool] = mapped_column(
+        Boolean, server_default=text("false"), nullable=False
+    )
+
+    __table_args__ = (
+        # Не больше одной активной задачи на сайт - повторный enqueue ничего не делает
+        Index(
+            "ux_parse_jobs_active",
+            "site_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index("ix_parse_jobs_claim", "status", "run_after"),
+    )
+
+
+class ParseTiming(Base):
+    """Длительность стадий парсинга; parse_result_id без FK - parse_results партиционирована"""
+
+    __tablename__ = "parse_timings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    cycle_id: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
+    site_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    parse_result_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    stage: Mapped[str] = mapped_column(String(50), nullable=False)
+    seconds: Mapped[float] = mapped_column(Float, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (Index("ix_timing_site_stage", "site_id", "stage", "recorded_at"),)
+
+
+class PaymentMethodChange(Base):
+    """Изменения методов пополнения относительно прошлого успешного снимка сайта"""
+
+    __tablename__ = "payment_method_changes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Без FK, как в parse_timings: parse_results партиционирована
+    result_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    method_name: Mapped[str] = mapped_column(Text, nullable=False)
+    # added, removed, min_changed
+    change_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    old_min_amount: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    new_min_amount: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    __table_args__ = (
+        # Под keyset-пагинацию /history: (changed_at, id) < курсора внутри сайта
+        Index("ix_method_changes_keyset", "site_id", "changed_at", "id"),
     )
@@ -0,0 +1,186 @@
+import logging
+import re
+from datetime import date, datetime, timedelta, UTC
+from sqlalchemy import text
+from config.settings import DB_PARTITION_MONTHS_AHEAD, DB_RETENTION_DAYS
+
+
+class PartitionManager:
+    """Помесячные партиции parse_results: создание заранее и удаление просроченных"""
+
+    TABLE = "parse_results"
+    LEGACY_TABLE = "parse_results_legacy"
+    PARTITION_RE = re.compile(r"^parse_results_(\d{4})_(\d{2})$")
+
+    # Индексы непартиционированной таблицы: имена индексов глобальны в схеме
+    LEGACY_INDEXES = [
+        "ix_site_latest",
+        "ix_site_date",
+        "ix_parse_results_site_id",
+        "ix_parse_results_is_latest",
+        "ix_parse_results_parsed_at",
+    ]
+
+    COLUMNS = [
+        "id",
+        "site_id",
+        "status",
+        "payment_methods",
+        "site_url",
+        "screenshot_path",
+        "is_latest",
+        "parsed_at",
+        "error_message",
+        "content_hash",
+        "last_checked_at",
+    ]
+
+    def __init__(
+        self,
+        retention_days: int = DB_RETENTION_DAYS,
+        months_ahead: int = DB_PARTITION_MONTHS_AHEAD,
+    ):
+        self.retention_days = retention_days
+        self.months_ahead = months_ahead
+        self.logger = logging.getLogger("partition_manager")
+
+    @staticmethod
+    def month_start(value: date) -> date:
+        return date(value.year, value.month, 1)
+
+    @staticmethod
+    def add_months(value: date, months: int) -> date:
+        month_index = value.year * 12 + value.month - 1 + months
+        return date(month_index // 12, month_index % 12 + 1, 1)
+
+    def partition_name(self, month: date) -> str:
+        return f"{self.TABLE}_{month:%Y_%m}"
+
+    async def is_partitioned(self, conn) -> bool | None:
+        """True - партиционирована, False - обычная таблица, None - таблицы нет"""
+        relkind = await conn.scalar(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": self.TABLE},
+        )
+
+        if relkind is None:
+            return None
+
+        return relkind == "p"
+
+    async def prepare_legacy(self, conn) -> bool:
+        """Убирает с дороги обычную parse_results до create_all; True - есть что переносить"""
+        if await self.is_partitioned(conn) is not False:
+            return False
+
+        self.logger.info("🧱 Converting parse_results to a partitioned table")
+
+        await conn.execute(
+            text(f"ALTER TABLE {self.TABLE} RENAME TO {self.LEGACY_TABLE}")
+        )
+        await conn.execute(
+            text(
+                f"ALTER TABLE {self.LEGACY_TABLE} "
+                f"RENAME CONSTRAINT {self.TABLE}_pkey TO {self.LEGACY_TABLE}_pkey"
+            )
+        )
+        await conn.execute(
+            text(
+                f"ALTER SEQUENCE IF EXISTS {self.TABLE}_id_seq "
+                f"RENAME TO {self.LEGACY_TABLE}_id_seq"
+            )
+        )
+        for index in self.LEGACY_INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+        return True
+
+    async def migrate_legacy(self, conn):
+        """Переносит строки из старой таблицы в партиционированную и удаляет ее"""
+        oldest = await conn.scalar(
+            text(f"SELECT MIN(parsed_at) FROM {self.LEGACY_TABLE}")
+        )
+        await self.ensure_partitions(conn, oldest.date() if oldest else None)
+
+        columns = ", ".join(self.COLUMNS)
+        values = ", ".join(
+            "COALESCE(parsed_at, now())" if column == "parsed_at" else column
+            for column in self.COLUMNS
+        )
+        result = await conn.execute(
+            text(
+                f"INSERT INTO {self.TABLE} ({columns}) "
+                f"SELECT {values} FROM {self.LEGACY_TABLE}"
+            )
+        )
+        await conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{self.TABLE}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {self.TABLE}), 0) + 1, false)"
+            )
+        )
+        await conn.execute(text(f"DROP TABLE {self.LEGACY_TABLE}"))
+
+        self.logger.info(
+            f"🧱 Moved {result.rowcount} rows into partitioned parse_results"
+        )
+
+    async def ensure_partitions(self, conn, start: date | None = None):
+        today = datetime.now(UTC).date()
+        month = self.month_start(min(start or today, today))
+        last_month = self.add_months(self.month_start(today), self.months_ahead)
+
+        while month <= last_month:
+            next_month = self.add_months(month, 1)
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {self.partition_name(month)} "
+                    f"PARTITION OF {self.TABLE} "
+                    f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                    f"TO ('{next_month.isoformat()} 00:00:00+00')"
+                )
+            )
+            month = next_month
+
+    async def list_partitions(self, conn) -> list[tuple[str, date]]:
+        rows = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ),
+            {"table": self.TABLE},
+        )
+
+        partitions = []
+        for (name,) in rows:
+            match = self.PARTITION_RE.match(name)
+            if match:
+                partitions.append((name, date(int(match[1]), int(match[2]), 1)))
+
+        return sorted(partitions, key=lambda item: item[1])
+
+    async def drop_expired(self, conn) -> list[str]:
+        """Удаляет партиции, целиком вышедшие за DB_RETENTION_DAYS"""
+        cutoff = datetime.now(UTC) - timedelta(days=self.retention_days)
+
+        dropped = []
+        for name, month in await self.list_partitions(conn):
+            upper = self.add_months(month, 1)
+            if upper > cutoff.date():
+                continue
+
+            # Неизменившийся результат может жить в старой партиции: parsed_at - время
+            # снимка, переписывать его нельзя, поэтому партиция ждет смены данных сайта
+            has_latest = await conn.scalar(
+                text(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE is_latest)")
+            )
+            if has_latest:
+                self.logger.info(f"🧱 Keeping {name}: it holds latest results")
+                continue
+
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+
+        return dropped
@@ -0,0 +1,31 @@
+import time
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул соединений, который меряет время ожидания соединения при checkout"""
+
+    # Checkout дольше порога считаем признаком нехватки соединений
+    SLOW_CHECKOUT_SECONDS = 0.1
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = {
+            "checkouts": 0,
+            "slow_checkouts": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = time.perf_counter() - start
+            stats = self.checkout_stats
+            stats["checkouts"] += 1
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+            if wait > self.SLOW_CHECKOUT_SECONDS:
+                stats["slow_checkouts"] += 1
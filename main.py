@@ -1,6 +1,15 @@
 import asyncio
 import logging
-from config.settings import setup_logging, load_config, validate_settings
+import time
+from contextlib import contextmanager
+from config.settings import (
+    setup_logging,
+    load_config,
+    validate_settings,
+    PARSE_PROCESSES,
+    PARSER_MODE,
+)
+from parser.config_watcher import ConfigWatcher
 from parser.parser_manager import ParserManager
 from parser.scheduler import ParserScheduler
 from bot.bot import ParserBot
@@ -11,39 +20,92 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-async def main():
+@contextmanager
+def startup_phase(phases: dict, name: str):
+    start = time.perf_counter()
     try:
-        # Проверка настроек
-        validate_settings()
+        yield
+    finally:
+        phases[name] = time.perf_counter() - start
+
+
+async def run_initial_cycle(parser_manager: ParserManager, started_at: float):
+    """Стартовый цикл парсинга в фоне: бот отвечает из БД, пока он идет"""
+    try:
+        await parser_manager.parse_all_sites()
+        logger.info(
+            f"✅ Initial parse cycle finished {time.perf_counter() - started_at:.1f}s after start"
+        )
+    except Exception as e:
+        logger.error(f"❌ Initial parse cycle failed: {e}")
+        logger.exception("Full traceback:")
+
 
+async def main():
+    started_at = time.perf_counter()
+    phases: dict[str, float] = {}
+    initial_cycle = None
+
+    try:
         logger.info("=" * 60)
         logger.info("🚀 Starting Parser Application")
         logger.info("=" * 60)
 
-        # Загрузка конфигурации
-        config = load_config()
+        # Загрузка конфигурации; watcher создается раньше, чтобы не пропустить правку
+        with startup_phase(phases, "config"):
+            # Проверка настроек
+            validate_settings()
+
+            config_watcher = ConfigWatcher()
+            config = load_config()
         logger.info(f"📋 Loaded config for {len(config['sites'])} sites")
         logger.info(f"⏰ Parse interval: {config['parse_interval_hours']} hour(s)")
 
         # Инициализация БД
-        db = DBManager()
-        await db.init_db()
+        with startup_phase(phases, "db_init"):
+            db = DBManager()
+            await db.init_db()
 
-        # Создание парсер менеджера
-        parser_manager = ParserManager(config["sites"])
-        await parser_manager.parse_all_sites()
+        with startup_phase(phases, "components"):
+            # Создание парсер менеджера; браузеры запустятся при первом парсинге.
+            # В режиме очереди парсят воркеры - пул процессов здесь не нужен
+            parser_manager = ParserManager(
+                config["sites"],
+                db,
+                processes=PARSE_PROCESSES if PARSER_MODE == "inline" else 0,
+            )
+
+            # Запуск планировщика
+            scheduler = ParserScheduler(
+                parser_manager,
+                interval_hours=config["parse_interval_hours"],
+            )
+            scheduler.start()
+
+            # Правки sites_config.yaml применяются к затронутым сайтам без перезапуска
+            config_watcher.add_listener(
+                lambda sites: scheduler.apply_config_diff(
+                    parser_manager.apply_sites_config(sites)
+                )
+            )
+            config_watcher.start()
+
+            # Запуск бота
+            bot = ParserBot(config["telegram_bot_token"], db, started_at=started_at)
+            # Сохраненный результат сбрасывает кэш ответов бота
+            db.add_save_listener(bot.result_cache.invalidate)
 
-        # Запуск планировщика
-        scheduler = ParserScheduler(
-            parser_manager,
-            interval_hours=config["parse_interval_hours"],
+        logger.info(
+            "⏱️ Startup phases: "
+            + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in phases.items())
         )
-        scheduler.start()
 
-        # Запуск бота
-        bot = ParserBot(config["telegram_bot_token"])
+        # В режиме очереди сайты парсят воркеры (worker.py), здесь только планировщик
+        if PARSER_MODE == "inline":
+            initial_cycle = asyncio.create_task(
+                run_initial_cycle(parser_manager, started_at)
+            )
 
-        # logger.info("✅ All components initialized")
         logger.info("🤖 Starting Telegram bot...")
 
         await bot.start_polling()
@@ -51,8 +113,13 @@ async def main():
     except KeyboardInterrupt:
         logger.info("\n⚠️  Received shutdown signal")
         logger.info("🛑 Shutting down gracefully...")
+        if initial_cycle is not None:
+            initial_cycle.cancel()
+        await config_watcher.stop()
         scheduler.stop()
         await bot.stop()
+        await parser_manager.close()
+        await db.close()
         logger.info("👋 Application stopped")
     except Exception as e:
         logger.error(f"❌ Fatal error: {e}")
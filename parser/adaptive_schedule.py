@@ -0,0 +1,60 @@
+import random
+from config.settings import (
+    SCHEDULE_JITTER_SECONDS,
+    SCHEDULE_MAX_INTERVAL_FACTOR,
+    SCHEDULE_UNCHANGED_STEP,
+)
+
+
+class SiteSchedule:
+    """Интервал запуска сайта: backoff при ошибках, замедление при неизменных данных"""
+
+    def __init__(self, site_config: dict, default_interval_minutes: float):
+        schedule = site_config.get("schedule", {})
+
+        self.site_id = site_config["id"]
+        self.base_interval = (
+            schedule.get("interval_minutes", default_interval_minutes) * 60
+        )
+        max_minutes = schedule.get("max_interval_minutes")
+        self.max_interval = max(
+            self.base_interval,
+            max_minutes * 60
+            if max_minutes
+            else self.base_interval * SCHEDULE_MAX_INTERVAL_FACTOR,
+        )
+        self.jitter = schedule.get("jitter_seconds", SCHEDULE_JITTER_SECONDS)
+
+        self.failures = 0
+        self.unchanged_streak = 0
+
+    def record(self, status: str | None, changed: bool | None):
+        """Учитывает исход очередного запуска"""
+        if status != "success":
+            self.failures += 1
+            return
+
+        self.failures = 0
+
+        if changed is False:
+            self.unchanged_streak += 1
+        else:
+            self.unchanged_streak = 0
+
+    def current_interval(self) -> float:
+        if self.failures:
+            interval = self.base_interval * 2**self.failures
+        else:
+            interval = self.base_interval * (
+                1 + SCHEDULE_UNCHANGED_STEP * self.unchanged_streak
+            )
+
+        return min(interval, self.max_interval)
+
+    def next_delay(self) -> float:
+        """Секунды до следующего запуска с учетом джиттера"""
+        return self.current_interval() + random.uniform(0, self.jitter)
+
+    def initial_delay(self) -> float:
+        """Первый запуск, когда стартовый цикл не выполнялся в процессе"""
+        return random.uniform(0, self.jitter)
@@ -1,55 +1,242 @@
 import asyncio
 import random
 import logging
-from playwright.async_api import async_playwright
+import time
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from datetime import datetime, UTC
-from config.settings import BROWSER_TIMEOUT, HEADLESS_MODE, BROWSER_ARGS, CONTEXT_PARAMS
+from config.settings import HTTP_FAST_PATH, SESSION_CHECK_TIMEOUT
+from database.hashing import payment_methods_hash
+from parser.browser_pool import BrowserPool
+from parser.extraction import compile_extractor
+from parser.har_archive import HarArchive
+from parser.http_client import HttpClient
+from parser.readiness import ReadinessWaiter
+from parser.response_capture import ResponseCapture
+from parser.request_blocker import RequestBlocker
 from parser.screenshot_manager import ScreenshotManager
+from parser.session_store import SessionStore
 
 
 class BaseParser(ABC):
-    def __init__(self, config: dict):
+    # Заголовки, которые не переносим из браузерного XHR в прямой запрос
+    REPLAY_SKIP_HEADERS = {
+        "cookie",
+        "host",
+        "content-length",
+        "connection",
+        "accept-encoding",
+    }
+
+    def __init__(
+        self,
+        config: dict,
+        browser_pool: BrowserPool,
+        http_client: HttpClient,
+        previous_hash: str | None = None,
+    ):
         self.config = config
+        self.browser_pool = browser_pool
+        self.http_client = http_client
         self.logger = logging.getLogger(f"parser.{config['id']}")
         self.screenshot_manager = ScreenshotManager()
+        self.session_store = SessionStore()
+        self.session_restored = False
+        self.capture = ResponseCapture.from_config(config)
+        # Правила topup.extract компилируются один раз на парсер, а не на каждый ответ
+        self.extractor = compile_extractor(config["topup"]["extract"])
+        self.readiness = ReadinessWaiter(
+            config["id"], config.get("readiness"), self.capture
+        )
+        # Запись/воспроизведение HAR (HAR_MODE) для офлайн-прогонов и профилирования
+        self.har = HarArchive(config["id"])
+        # content_hash последнего сохраненного результата - для пропуска скриншота
+        self.previous_hash = previous_hash
+        # Стадия -> секунды; уходит в результат и в таблицу parse_timings
+        self.timings: dict[str, float] = {}
 
     async def parse(self) -> dict:
+        start = time.perf_counter()
+        data = None
+
+        # С HAR весь прогон идет через браузер: быстрый путь мимо записи не нужен
+        if (
+            HTTP_FAST_PATH
+            and self.config["topup"].get("fast_path")
+            and not self.har.enabled
+        ):
+            async with self.stage("fast_path"):
+                data = await self.parse_fast_path()
+
+        if data is None:
+            data = await self.parse_with_browser()
+
+        self.timings["total"] = time.perf_counter() - start
+        data["timings"] = {
+            stage: round(seconds, 3) for stage, seconds in self.timings.items()
+        }
+
+        return data
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (
+                self.timings.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    async def parse_fast_path(self) -> dict | None:
+        """Повторяет записанный XHR кассы без браузера; None - нужен полный браузерный прогон"""
         start_time = datetime.now(UTC)
+        site_id = self.config["id"]
+
+        endpoint = self.session_store.load_endpoint(site_id)
+        if not endpoint:
+            return None
+
+        cookie_header = self.session_store.get_cookie_header(site_id, endpoint["url"])
+        if not cookie_header:
+            return None
+
+        headers = {**endpoint["headers"], "cookie": cookie_header}
+        if endpoint.get("etag"):
+            headers["if-none-match"] = endpoint["etag"]
+        if endpoint.get("last_modified"):
+            headers["if-modified-since"] = endpoint["last_modified"]
+
+        try:
+            status, payload, response_headers = await self.http_client.get_json(
+                endpoint["url"], headers
+            )
+        except Exception as e:
+            self.logger.warning(f"⚠️ Fast path request failed: {e}")
+            return None
+
+        if status == 304:
+            payload = endpoint.get("payload")
+        elif status in (401, 403):
+            self.logger.info(f"🔒 Fast path got {status}, falling back to browser")
+            self.on_login_wall()
+            return None
+        elif status != 200:
+            self.logger.info(f"⚠️ Fast path got {status}, falling back to browser")
+            return None
+
+        try:
+            payment_methods = self.extract_payment_methods(payload)
+        except (AttributeError, KeyError, TypeError, ValueError, IndexError) as e:
+            self.logger.info(
+                f"⚠️ Fast path schema mismatch ({e}), falling back to browser"
+            )
+            return None
+
+        # Пустой список чаще означает сменившийся формат ответа, чем отсутствие методов
+        if not payment_methods:
+            self.logger.info("⚠️ Fast path returned no methods, falling back to browser")
+            return None
+
+        # Без браузера нет свежего скриншота: быстрый путь годится только для
+        # неизменившихся данных, иначе подтверждение противоречило бы тексту
+        if payment_methods_hash(payment_methods) != self.previous_hash:
+            self.logger.info("🔄 Fast path data changed, falling back to browser")
+            return None
+
+        if status == 200:
+            self._save_endpoint(
+                endpoint["url"], endpoint["headers"], response_headers, payload
+            )
+
+        # Данные совпадают с прошлым снимком - его скриншот остается актуальным
+        screenshot_path = self.screenshot_manager.get_latest_screenshot(site_id)
+
+        parse_time = (datetime.now(UTC) - start_time).total_seconds()
+        self.logger.info(
+            f"⚡ Fast path ({status}) completed in {parse_time:.2f}s for {self.config['name']}"
+        )
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=HEADLESS_MODE, args=BROWSER_ARGS)
+        return {
+            "site_id": site_id,
+            "payment_methods": payment_methods,
+            "screenshot_path": screenshot_path,
+            "status": "success",
+            "parsed_at": datetime.now(UTC),
+            "site_url": self.config["auth"]["site_url"],
+        }
 
-            context = await browser.new_context(**CONTEXT_PARAMS)
+    async def parse_with_browser(self) -> dict:
+        start_time = datetime.now(UTC)
 
-            context.set_default_timeout(BROWSER_TIMEOUT)
+        # В HAR-режимах всегда с логина: запись содержит весь путь, воспроизведение
+        # не зависит от сохраненной сессии
+        storage_state = None
+        if not self.har.enabled:
+            storage_state = self.session_store.load(self.config["id"])
+        self.session_restored = storage_state is not None
+
+        lease_start = time.perf_counter()
+
+        async with self.browser_pool.lease_context(
+            timings=self.timings,
+            storage_state=storage_state,
+            **self.har.context_params(),
+        ) as context:
+            self.timings["browser_lease"] = time.perf_counter() - lease_start
+
+            # Заблокированные запросы не попали бы в запись
+            request_blocker = None
+            if not self.har.enabled:
+                request_blocker = RequestBlocker.from_config(self.config)
+            if request_blocker:
+                await request_blocker.attach(context)
+            await self.har.attach(context)
+            await self.capture.attach(context)
 
             page = await context.new_page()
 
             try:
                 self.logger.info(f"🚀 Starting parse for {self.config['name']}")
 
-                await self.authenticate(page)
+                async with self.stage("authenticate"):
+                    await self.ensure_authenticated(page)
                 self.logger.info(f"✅ Authenticated on {self.config['name']}")
 
-                await self.navigate_to_topup(page)
+                async with self.stage("navigate_to_topup"):
+                    await self.navigate_to_topup(page)
                 self.logger.info("✅ Navigated to topup page")
 
-                data = await self.parse_topup_data(page)
+                async with self.stage("parse_topup_data"):
+                    data = await self.parse_topup_data(page)
                 self.logger.info(
                     f"✅ Parsed {len(data.get('payment_methods', []))} payment methods"
                 )
 
-                screenshot_path = await self.take_screenshot(page)
+                if self.is_unchanged(data):
+                    # Данные те же - скриншот последнего снимка остается актуальным
+                    screenshot_path = self.screenshot_manager.get_latest_screenshot(
+                        self.config["id"]
+                    )
+                    self.logger.info("⏭️ Data unchanged, screenshot skipped")
+                else:
+                    async with self.stage("take_screenshot"):
+                        screenshot_path = await self.take_screenshot(page)
                 data["screenshot_path"] = screenshot_path
 
                 data["status"] = "success"
                 data["parsed_at"] = datetime.now(UTC)
                 data["site_url"] = self.config["auth"]["site_url"]
+                if request_blocker:
+                    data["network_stats"] = request_blocker.stats
 
                 parse_time = (datetime.now(UTC) - start_time).total_seconds()
                 self.logger.info(
-                    f"✅ Parse completed in {parse_time:.2f}s for {self.config['name']}"
+                    f"✅ Parse completed in {parse_time:.2f}s for {self.config['name']}: "
+                    + ", ".join(
+                        f"{stage} {seconds:.2f}s"
+                        for stage, seconds in self.timings.items()
+                    )
                 )
 
                 return data
@@ -64,9 +251,13 @@ class BaseParser(ABC):
                 self.logger.error(f"❌ Error message: {str(e)}")
                 self.logger.exception("Full traceback:")
 
+                if self.session_restored and await self._is_login_wall(page):
+                    self.on_login_wall()
+
                 try:
-                    error_screenshot = f"error_{self.config['id']}_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}.png"
-                    await page.screenshot(path=f"screenshots/{error_screenshot}")
+                    error_screenshot = await self.screenshot_manager.save_error(
+                        self.config["id"], await page.screenshot()
+                    )
                     self.logger.info(f"📸 Error screenshot saved: {error_screenshot}")
                 except:
                     raise
@@ -79,7 +270,51 @@ class BaseParser(ABC):
                 }
 
             finally:
-                await browser.close()
+                if request_blocker:
+                    request_blocker.log_stats()
+
+    async def ensure_authenticated(self, page):
+        """Логинится, только если сохраненная сессия отсутствует или невалидна"""
+        if self.session_restored:
+            if await self.is_session_valid(page):
+                self.logger.info("♻️ Reusing saved session")
+                return
+
+            self.logger.info("⚠️ Saved session is no longer valid")
+            self.session_store.invalidate(self.config["id"])
+            self.session_restored = False
+
+        await self.authenticate(page)
+
+        if not self.har.enabled:
+            await self.session_store.save(self.config["id"], page.context)
+
+    async def is_session_valid(self, page) -> bool:
+        auth = self.config["auth"]
+        check_url = auth.get("session_check_url", auth["site_url"])
+
+        await page.goto(check_url, wait_until="domcontentloaded")
+
+        try:
+            await page.wait_for_selector(
+                auth["success_indicator"], timeout=SESSION_CHECK_TIMEOUT
+            )
+            return True
+        except Exception:
+            return False
+
+    def on_login_wall(self):
+        """Хук: парсинг уперся в форму логина, сохраненная сессия больше не годится"""
+        self.logger.warning(f"🔒 Login wall hit on {self.config['name']}")
+        self.session_store.invalidate(self.config["id"])
+
+    async def _is_login_wall(self, page) -> bool:
+        login_selector = self.config["auth"]["login_selector"]
+
+        try:
+            return await page.locator(login_selector).first.is_visible()
+        except Exception:
+            return False
 
     async def authenticate(self, page):
         auth = self.config["auth"]
@@ -109,15 +344,62 @@ class BaseParser(ABC):
     async def parse_topup_data(self, page) -> dict:
         pass
 
+    def extract_payment_methods(self, data: dict) -> list[dict]:
+        """Методы пополнения из ответа кассы по правилам topup.extract"""
+        return self.extractor(data)
+
+    async def remember_endpoint(self, request, response, payload: dict):
+        """Запоминает XHR кассы, чтобы следующие циклы шли мимо браузера"""
+        if not self.config["topup"].get("fast_path") or self.har.enabled:
+            return
+
+        request_headers = await request.all_headers()
+        headers = {
+            key: value
+            for key, value in request_headers.items()
+            if not key.startswith(":") and key not in self.REPLAY_SKIP_HEADERS
+        }
+
+        self._save_endpoint(request.url, headers, await response.all_headers(), payload)
+
+    def _save_endpoint(self, url: str, headers: dict, response_headers: dict, payload):
+        response_headers = {k.lower(): v for k, v in response_headers.items()}
+
+        self.session_store.save_endpoint(
+            self.config["id"],
+            {
+                "url": url,
+                "headers": headers,
+                "etag": response_headers.get("etag"),
+                "last_modified": response_headers.get("last-modified"),
+                "payload": payload,
+            },
+        )
+
+    def is_unchanged(self, data: dict) -> bool:
+        if not self.config["topup"].get("skip_unchanged_screenshot"):
+            return False
+
+        if self.previous_hash is None:
+            return False
+
+        if not self.screenshot_manager.get_latest_screenshot(self.config["id"]):
+            return False
+
+        return payment_methods_hash(data.get("payment_methods")) == self.previous_hash
+
     async def take_screenshot(self, page) -> str:
         topup_config = self.config["topup"]
 
-        filepath = self.screenshot_manager.get_screenshot_path(self.config["id"])
         element = page.locator(topup_config["screenshot_selector"])
-        await asyncio.sleep(1)
-        await element.screenshot(path=filepath)
-        self.logger.info(f"Screenshot saved: {filepath}")
-        return filepath
+        await self.readiness.wait(
+            page,
+            "screenshot",
+            default=[{"stable": topup_config["screenshot_selector"]}],
+        )
+        image = await element.screenshot()
+
+        return await self.screenshot_manager.save(self.config["id"], image)
 
     async def _random_delay(self, min_seconds=1.0, max_seconds=3.0):
         """Случайная задержка для имитации человека"""
@@ -127,6 +409,11 @@ class BaseParser(ABC):
 
     async def _human_like_type(self, page, selector: str, text: str):
         """Печатает текст с задержками как человек"""
+        if self.har.replaying:
+            # Сайта нет - имитировать человека не для кого
+            await page.fill(selector, text)
+            return
+
         await page.click(selector)
         await self._random_delay(0.1, 0.3)
 
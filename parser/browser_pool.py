@@ -0,0 +1,207 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from config.settings import (
+    BROWSER_ARGS,
+    BROWSER_MAX_CONTEXTS,
+    BROWSER_POOL_SIZE,
+    BROWSER_TIMEOUT,
+    CONTEXT_PARAMS,
+    HEADLESS_MODE,
+)
+
+
+class PooledBrowser:
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.browser = None
+        self.contexts_served = 0
+
+
+class BrowserPool:
+    """Пул прогретых браузеров, из которого парсеры берут изолированные контексты"""
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_contexts: int = BROWSER_MAX_CONTEXTS,
+    ):
+        self.size = max(1, size)
+        self.max_contexts = max(1, max_contexts)
+        self.logger = logging.getLogger("browser_pool")
+
+        self._playwright = None
+        self._slots: list[PooledBrowser] = []
+        self._idle: asyncio.Queue | None = None
+        self._lock = asyncio.Lock()
+
+        self.stats = {
+            "launches": 0,
+            "leases": 0,
+            "recycles": 0,
+            "unhealthy": 0,
+            "launch_seconds": 0.0,
+            "start_seconds": 0.0,
+        }
+
+    @property
+    def started(self) -> bool:
+        # Очередь появляется только после запуска всех браузеров
+        return self._idle is not None
+
+    async def start(self):
+        async with self._lock:
+            if self.started:
+                return
+
+            # Playwright импортируется при первом запуске пула, а не при старте бота
+            from playwright.async_api import async_playwright
+
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+
+            self._playwright = await async_playwright().start()
+            idle = asyncio.Queue()
+
+            try:
+                for slot in range(self.size):
+                    pooled = PooledBrowser(slot)
+                    self._slots.append(pooled)
+                    await self._launch(pooled)
+                    idle.put_nowait(pooled)
+
+            except Exception as e:
+                # Недозапущенный пул не оставляем: следующий start() начнет с нуля
+                self.logger.error(f"❌ Browser pool failed to start: {e}")
+                for pooled in self._slots:
+                    await self._close_browser(pooled)
+
+                try:
+                    await self._playwright.stop()
+                except Exception as stop_error:
+                    self.logger.warning(f"⚠️ Failed to stop playwright: {stop_error}")
+
+                self._playwright = None
+                self._slots = []
+                raise
+
+            self._idle = idle
+
+            # Старт пула общий для всех ждущих его парсеров - это время пула, не сайта
+            elapsed = loop.time() - start
+            self.stats["start_seconds"] += elapsed
+
+            self.logger.info(
+                f"🌐 Browser pool started with {self.size} browser(s) in {elapsed:.2f}s"
+            )
+
+    async def stop(self):
+        async with self._lock:
+            if not self.started:
+                return
+
+            for pooled in self._slots:
+                await self._close_browser(pooled)
+
+            await self._playwright.stop()
+            self._playwright = None
+            self._slots = []
+            self._idle = None
+
+            self.logger.info(f"🌐 Browser pool stopped. Stats: {self.get_stats()}")
+
+    @asynccontextmanager
+    async def lease_context(self, timings: dict | None = None, **context_params):
+        """Выдает новый BrowserContext на одном из браузеров пула
+
+        Если браузер пришлось перезапустить для этой аренды, время запуска
+        добавляется в timings["browser_launch"].
+        """
+        if not self.started:
+            await self.start()
+
+        idle = self._idle
+        pooled = await idle.get()
+        context = None
+
+        try:
+            launched = await self._ensure_healthy(pooled)
+            if timings is not None and launched:
+                timings["browser_launch"] = (
+                    timings.get("browser_launch", 0.0) + launched
+                )
+
+            context = await pooled.browser.new_context(
+                **{**CONTEXT_PARAMS, **context_params}
+            )
+            context.set_default_timeout(BROWSER_TIMEOUT)
+
+            pooled.contexts_served += 1
+            self.stats["leases"] += 1
+
+            yield context
+
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Failed to close context: {e}")
+
+            # Пул могли остановить (или перезапустить) за время аренды -
+            # браузер старого пула уже закрыт, возвращать его некуда
+            if self._idle is idle:
+                idle.put_nowait(pooled)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle else 0,
+        }
+
+    async def _ensure_healthy(self, pooled: PooledBrowser) -> float:
+        """Перезапускает браузер при необходимости; возвращает время запуска"""
+        if pooled.browser is None or not pooled.browser.is_connected():
+            self.stats["unhealthy"] += 1
+            self.logger.warning(
+                f"⚠️ Browser #{pooled.slot} is not connected, relaunching"
+            )
+            await self._close_browser(pooled)
+            return await self._launch(pooled)
+
+        if pooled.contexts_served >= self.max_contexts:
+            self.stats["recycles"] += 1
+            self.logger.info(
+                f"♻️ Recycling browser #{pooled.slot} after {pooled.contexts_served} contexts"
+            )
+            await self._close_browser(pooled)
+            return await self._launch(pooled)
+
+        return 0.0
+
+    async def _launch(self, pooled: PooledBrowser) -> float:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        pooled.browser = await self._playwright.chromium.launch(
+            headless=HEADLESS_MODE, args=BROWSER_ARGS
+        )
+        pooled.contexts_served = 0
+
+        elapsed = loop.time() - start
+        self.stats["launches"] += 1
+        self.stats["launch_seconds"] += elapsed
+
+        return elapsed
+
+    async def _close_browser(self, pooled: PooledBrowser):
+        if pooled.browser is None:
+            return
+
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            self.logger.warning(f"⚠️ Failed to close browser #{pooled.slot}: {e}")
+        finally:
+            pooled.browser = None
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from config.settings import CONFIG_DIR, CONFIG_WATCH_INTERVAL, load_sites_config
+
+
+class ConfigWatcher:
+    """Следит за sites_config.yaml и отдает слушателям новый проверенный список сайтов"""
+
+    def __init__(self, interval: float = CONFIG_WATCH_INTERVAL):
+        # Тот же файл, что читает load_sites_config
+        self.path = CONFIG_DIR / "sites_config.yaml"
+        self.interval = interval
+        self.listeners = []
+        self.logger = logging.getLogger("config_watcher")
+
+        self._task: asyncio.Task | None = None
+        self._signature = self._get_signature()
+
+    def add_listener(self, callback):
+        """callback(sites) - обычная функция или корутина"""
+        self.listeners.append(callback)
+
+    def start(self):
+        if self.interval <= 0 or self._task is not None:
+            return
+
+        self._task = asyncio.create_task(self._run())
+        self.logger.info(f"👀 Watching {self.path} every {self.interval:g}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.check()
+            except Exception as e:
+                self.logger.error(f"Error checking sites config: {e}")
+
+    async def check(self) -> bool:
+        """Перечитывает конфиг, если файл изменился; True - слушатели получили новый"""
+        signature = self._get_signature()
+        if signature == self._signature:
+            return False
+
+        # Запоминаем и неудачную версию: ошибка в файле не должна логироваться каждый тик
+        self._signature = signature
+
+        try:
+            sites = await asyncio.to_thread(load_sites_config)
+        except Exception as e:
+            self.logger.error(f"❌ Sites config rejected, keeping current one: {e}")
+            return False
+
+        self.logger.info(f"🔄 Sites config changed, applying {len(sites)} site(s)")
+
+        for callback in self.listeners:
+            try:
+                result = callback(sites)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.error(f"Error in config listener: {e}")
+
+        return True
+
+    def _get_signature(self) -> tuple | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, UTC
+from config.settings import PARSE_CONCURRENCY, SITE_PARSE_TIMEOUT
+
+
+class ParseExecutor:
+    """Параллельный запуск парсинга сайтов с ограничением и дедлайном на сайт"""
+
+    def __init__(
+        self,
+        concurrency: int = PARSE_CONCURRENCY,
+        site_timeout: float = SITE_PARSE_TIMEOUT,
+        deadline_grace: float = 0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.site_timeout = site_timeout
+        # Запас сверх дедлайна, когда дедлайн соблюдает сам процесс-воркер
+        self.deadline_grace = deadline_grace
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.logger = logging.getLogger("parse_executor")
+
+    async def run(self, sites: list[dict], worker) -> tuple[list[dict], dict]:
+        """Запускает worker(site_config) для всех сайтов, возвращает результаты и сводку цикла"""
+        start = time.perf_counter()
+
+        outcomes = await asyncio.gather(
+            *(self.run_site(site_config, worker) for site_config in sites)
+        )
+
+        wall_time = time.perf_counter() - start
+        results = [result for result, _ in outcomes]
+        sum_site_time = sum(elapsed for _, elapsed in outcomes)
+
+        summary = {
+            "sites": len(sites),
+            "concurrency": self.concurrency,
+            "wall_time": round(wall_time, 2),
+            "sum_site_time": round(sum_site_time, 2),
+            "speedup": round(sum_site_time / wall_time, 2) if wall_time else 0.0,
+            "success": sum(1 for r in results if r.get("status") == "success"),
+            "errors": sum(1 for r in results if r.get("status") == "error"),
+            "timeouts": sum(1 for r in results if r.get("status") == "timeout"),
+        }
+
+        return results, summary
+
+    async def run_site(self, site_config: dict, worker) -> tuple[dict, float]:
+        site_id = site_config["id"]
+        timeout = (
+            site_config.get("timeout_seconds", self.site_timeout) + self.deadline_grace
+        )
+
+        async with self.semaphore:
+            start = time.perf_counter()
+
+            try:
+                result = await asyncio.wait_for(worker(site_config), timeout=timeout)
+
+            except asyncio.TimeoutError:
+                self.logger.error(f"⏱️ {site_id} missed its {timeout}s deadline")
+                result = {
+                    "site_id": site_id,
+                    "status": "timeout",
+                    "error_message": f"Deadline of {timeout}s exceeded",
+                    "parsed_at": datetime.now(UTC),
+                }
+
+            except Exception as e:
+                self.logger.error(f"Error parsing {site_id}: {e}")
+                result = {
+                    "site_id": site_id,
+                    "status": "error",
+                    "error_message": str(e),
+                    "parsed_at": datetime.now(UTC),
+                }
+
+            elapsed = time.perf_counter() - start
+
+        return result, elapsed
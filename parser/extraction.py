@@ -0,0 +1,140 @@
+import json
+from functools import lru_cache
+
+
+class ExtractionError(ValueError):
+    """Ответ кассы не соответствует правилам извлечения (сменился формат)"""
+
+
+def _to_int(value):
+    # "1000.00" -> 1000, как раньше делали парсеры через split(".")
+    if isinstance(value, str):
+        return int(value.split(".")[0])
+    return int(value)
+
+
+TRANSFORMS = {
+    "strip": lambda value: value.strip(),
+    "capitalize": lambda value: value.capitalize(),
+    "lower": lambda value: value.lower(),
+    "upper": lambda value: value.upper(),
+    "int": _to_int,
+    "float": float,
+}
+
+_MISSING = object()
+
+
+def _compile_path(path: str) -> tuple:
+    """'limit.RUB.min' -> ('limit', 'RUB', 'min'); числовые части - индексы списков"""
+    return tuple(int(part) if part.isdigit() else part for part in path.split("."))
+
+
+def _make_getter(path: str):
+    keys = _compile_path(path)
+
+    def get(item):
+        for key in keys:
+            try:
+                item = item[key]
+            except (KeyError, IndexError, TypeError):
+                return _MISSING
+        return item
+
+    return get
+
+
+def _make_filter(rule: dict):
+    field = rule["field"]
+    get = _make_getter(field)
+
+    if "in" in rule:
+        values, keep = frozenset(rule["in"]), True
+    elif "not_in" in rule:
+        values, keep = frozenset(rule["not_in"]), False
+    else:
+        raise ValueError(f"Filter on {field} needs 'in' or 'not_in'")
+
+    def check(item) -> bool:
+        value = get(item)
+        try:
+            return (value in values) is keep
+        except TypeError:
+            # dict/list вместо скаляра - сменился формат ответа
+            raise ExtractionError(f"Filter on {field}: unhashable value {value!r}")
+
+    return check
+
+
+def _make_field(name: str, rule):
+    if isinstance(rule, str):
+        rule = {"path": rule}
+
+    # Несколько путей - берется первое непустое значение
+    paths = rule["path"] if isinstance(rule["path"], list) else [rule["path"]]
+    getters = [_make_getter(path) for path in paths]
+
+    transforms = []
+    for transform in rule.get("transform", []):
+        if transform not in TRANSFORMS:
+            raise ValueError(f"Unknown transform '{transform}' for field {name}")
+        transforms.append(TRANSFORMS[transform])
+
+    def extract(item):
+        for get in getters:
+            value = get(item)
+            if value is not _MISSING and value not in (None, ""):
+                break
+        else:
+            if rule.get("optional"):
+                return None
+            raise ExtractionError(f"Field {name} not found in {paths}")
+
+        try:
+            for transform in transforms:
+                value = transform(value)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ExtractionError(f"Field {name}: cannot convert {value!r}: {e}")
+
+        return value
+
+    return name, extract
+
+
+def _compile(spec: dict):
+    get_items = _make_getter(spec["items"])
+    filters = [_make_filter(rule) for rule in spec.get("filters", [])]
+    fields = [_make_field(name, rule) for name, rule in spec["fields"].items()]
+
+    def extract(data) -> list[dict]:
+        items = get_items(data)
+
+        if items is _MISSING or not isinstance(items, list):
+            raise ExtractionError(f"List '{spec['items']}' not found in response")
+
+        # Один проход: фильтры и поля уже скомпилированы в замыкания
+        return [
+            {name: get_field(item) for name, get_field in fields}
+            for item in items
+            if all(check(item) for check in filters)
+        ]
+
+    return extract
+
+
+@lru_cache(maxsize=None)
+def _compile_cached(spec_json: str):
+    return _compile(json.loads(spec_json))
+
+
+def compile_extractor(spec: dict):
+    """Компилирует topup.extract из sites_config.yaml в функцию ответ -> payment_methods
+
+    Результат кэшируется по содержимому правил: парсеры создаются на каждый запуск,
+    а в процессах пула конфиг приходит копией.
+    """
+    for key in ("items", "fields"):
+        if key not in spec:
+            raise ValueError(f"Extraction spec needs '{key}'")
+
+    return _compile_cached(json.dumps(spec, sort_keys=True, ensure_ascii=False))
@@ -0,0 +1,61 @@
+import logging
+from pathlib import Path
+from config.settings import HAR_MODE, HAR_PATH
+
+
+class HarArchive:
+    """Запись сетевого обмена парсера в HAR сайта и прогон из него без сети"""
+
+    MODES = ("off", "record", "replay")
+
+    def __init__(self, site_id: str, mode: str = HAR_MODE, base_path: Path = HAR_PATH):
+        if mode not in self.MODES:
+            raise ValueError(f"HAR mode must be one of {', '.join(self.MODES)}")
+
+        self.site_id = site_id
+        self.mode = mode
+        self.base_path = Path(base_path)
+        self.logger = logging.getLogger(f"har.{site_id}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def get_path(self) -> Path:
+        return self.base_path / f"{self.site_id}.har"
+
+    def context_params(self) -> dict:
+        """Параметры new_context: HAR пишется Playwright при закрытии контекста"""
+        if not self.recording:
+            return {}
+
+        self.base_path.mkdir(parents=True, exist_ok=True)
+        self.logger.info(f"⏺️ Recording HAR to {self.get_path()}")
+
+        return {
+            "record_har_path": str(self.get_path()),
+            "record_har_mode": "full",
+            "record_har_content": "embed",
+        }
+
+    async def attach(self, context):
+        if not self.replaying:
+            return
+
+        path = self.get_path()
+        if not path.exists():
+            raise FileNotFoundError(
+                f"No HAR for {self.site_id}: {path} (run with HAR_MODE=record first)"
+            )
+
+        # Запрос, которого нет в записи, не должен уйти в сеть
+        await context.route_from_har(str(path), not_found="abort")
+        self.logger.info(f"⏯️ Replaying HAR from {path}")
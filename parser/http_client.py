@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import aiohttp
+from config.settings import HTTP_POOL_LIMIT, HTTP_TIMEOUT
+
+
+class HttpClient:
+    """Общая aiohttp-сессия с пулом соединений для прямых запросов к API сайтов"""
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, limit: int = HTTP_POOL_LIMIT):
+        self.timeout = timeout
+        self.limit = limit
+        self.logger = logging.getLogger("http_client")
+
+        self._session: aiohttp.ClientSession | None = None
+        self._lock = asyncio.Lock()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    # Куки передаем явно из storage_state сайта
+                    cookie_jar=aiohttp.DummyCookieJar(),
+                )
+
+            return self._session
+
+    async def get_json(self, url: str, headers: dict) -> tuple[int, dict | None, dict]:
+        """Возвращает статус, JSON (None для не-200) и заголовки ответа"""
+        session = await self.get_session()
+
+        async with session.get(url, headers=headers) as response:
+            data = None
+            if response.status == 200:
+                data = await response.json(content_type=None)
+
+            return response.status, data, dict(response.headers)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -1,14 +1,47 @@
 from parser.parsers.site1_parser import Site1Parser
 from parser.parsers.site2_parser import Site2Parser
 from parser.parsers.site3_parser import Site3Parser
+from parser.browser_pool import BrowserPool
+from parser.executor import ParseExecutor
+from parser.http_client import HttpClient
+from parser.process_pool import ProcessParsePool
+from parser.screenshot_manager import ScreenshotManager
+from config.settings import PARSE_PROCESSES, PROCESS_DEADLINE_GRACE
 from database.db_manager import DBManager
+from functools import partial
+from uuid import uuid4
 import logging
+import time
+
+# site_id строк parse_timings, относящихся ко всему пулу браузеров, а не к сайту
+POOL_TIMING_SITE_ID = "browser_pool"
 
 
 class ParserManager:
-    def __init__(self, sites_config: list[dict]):
+    def __init__(
+        self,
+        sites_config: list[dict],
+        db: DBManager,
+        processes: int = PARSE_PROCESSES,
+    ):
         self.sites_config = sites_config
-        self.db = DBManager()
+        self.db = db
+        self.browser_pool = BrowserPool()
+        self.http_client = HttpClient()
+        self.screenshot_manager = ScreenshotManager()
+        self.executor = ParseExecutor()
+        self.process_pool = None
+
+        # Парсинг в отдельных процессах: здесь остаются только сохранение и бот
+        if processes > 0:
+            self.process_pool = ProcessParsePool(sites_config, processes)
+            self.executor = ParseExecutor(
+                concurrency=processes, deadline_grace=PROCESS_DEADLINE_GRACE
+            )
+
+        self.last_cycle_summary = None
+        # Сколько из stats["start_seconds"] пула уже записано в parse_timings
+        self.recorded_start_seconds = 0.0
         self.logger = logging.getLogger("parser_manager")
 
         self.parsers_map = {
@@ -20,26 +53,115 @@ class ParserManager:
     async def parse_all_sites(self):
         self.logger.info("Starting parse cycle")
 
-        # tasks = []
-        # for site_config in self.sites_config:
-        #     if site_config.get('enabled', True):
-        #         tasks.append(self.parse_site(site_config))
-        #
-        # results = await asyncio.gather(*tasks, return_exceptions=True)
+        sites = [
+            site_config
+            for site_config in self.sites_config
+            if site_config.get("enabled", True)
+        ]
 
-        results = []
-        for site_config in self.sites_config:
-            if site_config.get("enabled", True):
-                try:
-                    result = await self.parse_site(site_config)
-                    results.append(result)
-                except Exception as e:
-                    results.append(e)
+        cycle_id = uuid4().hex
+        previous_hashes = await self.get_previous_hashes()
+
+        results, summary = await self.executor.run(
+            sites,
+            lambda site_config: self.dispatch(
+                site_config, previous_hashes.get(site_config["id"])
+            ),
+        )
+
+        # Весь цикл, включая сайты с таймаутом, пишем одной транзакцией
+        await self.save_results(results, cycle_id)
+
+        self.last_cycle_summary = summary
 
         self.logger.info(f"Parse cycle completed. Results: {len(results)}")
+        self.logger.info(
+            f"Cycle summary: wall {summary['wall_time']}s vs "
+            f"sum {summary['sum_site_time']}s (x{summary['speedup']}), "
+            f"success={summary['success']}, errors={summary['errors']}, "
+            f"timeouts={summary['timeouts']}"
+        )
+        if self.process_pool:
+            self.logger.info(f"Process pool stats: {self.process_pool.get_stats()}")
+        else:
+            self.logger.info(f"Browser pool stats: {self.browser_pool.get_stats()}")
+        self.logger.info(f"DB pool stats: {self.db.get_pool_stats()}")
         return results
 
     async def parse_site(self, site_config: dict):
+        previous_hashes = await self.get_previous_hashes()
+
+        result, _ = await self.executor.run_site(
+            site_config,
+            partial(
+                self.dispatch, previous_hash=previous_hashes.get(site_config["id"])
+            ),
+        )
+        saved = await self.save_results([result], uuid4().hex)
+
+        # Планировщику нужно знать, изменились ли данные с прошлого запуска
+        if saved:
+            result["changed"] = saved[0]["changed"]
+
+        return result
+
+    def get_site_config(self, site_id: str) -> dict | None:
+        for site_config in self.sites_config:
+            if site_config["id"] == site_id:
+                return site_config
+
+        return None
+
+    def apply_sites_config(self, sites_config: list[dict]) -> dict[str, list[str]]:
+        """Подменяет конфиг сайтов и возвращает разницу со старым по site_id
+
+        Идущие парсинги доработают со своей копией site_config, следующие запуски
+        возьмут новую через get_site_config.
+        """
+        old = {site["id"]: site for site in self.sites_config}
+        new = {site["id"]: site for site in sites_config}
+
+        diff = {
+            "added": [site_id for site_id in new if site_id not in old],
+            "removed": [site_id for site_id in old if site_id not in new],
+            "changed": [
+                site_id
+                for site_id in new
+                if site_id in old and new[site_id] != old[site_id]
+            ],
+        }
+
+        for site_id in diff["added"]:
+            if site_id not in self.parsers_map:
+                self.logger.warning(f"⚠️ No parser for new site {site_id}")
+
+        self.sites_config = sites_config
+
+        self.logger.info(
+            "Sites config applied: "
+            + ", ".join(f"{key}={value}" for key, value in diff.items())
+        )
+        return diff
+
+    async def get_previous_hashes(self) -> dict[str, str]:
+        """Хэши последних данных: по ним парсер пропускает скриншот неизменившихся сайтов"""
+        try:
+            return await self.db.get_content_hashes()
+        except Exception as e:
+            self.logger.error(f"Error loading previous hashes: {e}")
+            return {}
+
+    async def dispatch(
+        self, site_config: dict, previous_hash: str | None = None
+    ) -> dict:
+        if self.process_pool is None:
+            return await self.run_parser(site_config, previous_hash)
+
+        return await self.process_pool.run_parser(site_config, previous_hash)
+
+    async def run_parser(
+        self, site_config: dict, previous_hash: str | None = None
+    ) -> dict:
         site_id = site_config["id"]
         self.logger.info(f"Parsing {site_id}")
 
@@ -48,14 +170,83 @@ class ParserManager:
             if not parser_class:
                 raise ValueError(f"No parser for {site_id}")
 
-            parser = parser_class(site_config)
-
-            result = await parser.parse()
+            parser = parser_class(
+                site_config, self.browser_pool, self.http_client, previous_hash
+            )
 
-            await self.db.save_parse_result(result)
-
-            return result
+            return await parser.parse()
 
         except Exception as e:
             self.logger.error(f"Error parsing {site_id}: {e}")
             return {"site_id": site_id, "status": "error", "error_message": str(e)}
+
+    async def save_results(self, results: list[dict], cycle_id: str) -> list[dict]:
+        start = time.perf_counter()
+
+        try:
+            saved = await self.db.save_parse_results(results)
+        except Exception as e:
+            self.logger.error(f"Error saving results: {e}")
+            saved = []
+
+        # Цикл сохраняется одним запросом - db_save у всех его сайтов общий
+        db_save = round(time.perf_counter() - start, 3)
+        for result in results:
+            result.setdefault("timings", {})["db_save"] = db_save
+
+        await self.save_timings(cycle_id, results, saved)
+        return saved
+
+    async def save_timings(self, cycle_id: str, results: list[dict], saved: list[dict]):
+        result_ids = {row["site_id"]: row["result_id"] for row in saved}
+
+        rows = [
+            {
+                "cycle_id": cycle_id,
+                "site_id": result["site_id"],
+                "parse_result_id": result_ids.get(result["site_id"]),
+                "stage": stage,
+                "seconds": seconds,
+            }
+            for result in results
+            for stage, seconds in result.get("timings", {}).items()
+        ]
+
+        # Ленивый старт пула браузеров пишем один раз отдельной строкой пула
+        start_seconds = self.browser_pool.stats["start_seconds"]
+        if start_seconds > self.recorded_start_seconds:
+            rows.append(
+                {
+                    "cycle_id": cycle_id,
+                    "site_id": POOL_TIMING_SITE_ID,
+                    "parse_result_id": None,
+                    "stage": "browser_start",
+                    "seconds": round(start_seconds - self.recorded_start_seconds, 3),
+                }
+            )
+            self.recorded_start_seconds = start_seconds
+
+        try:
+            await self.db.save_parse_timings(rows)
+        except Exception as e:
+            self.logger.error(f"Error saving parse timings: {e}")
+
+    async def run_maintenance(self):
+        try:
+            await self.db.run_maintenance()
+        except Exception as e:
+            self.logger.error(f"Error running DB maintenance: {e}")
+
+        try:
+            await self.screenshot_manager.sweep(
+                {site_config["id"] for site_config in self.sites_config}
+            )
+        except Exception as e:
+            self.logger.error(f"Error sweeping screenshots: {e}")
+
+    async def close(self):
+        if self.process_pool:
+            await self.process_pool.stop()
+
+        await self.http_client.close()
+        await self.browser_pool.stop()
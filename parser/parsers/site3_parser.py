@@ -10,7 +10,9 @@ class Site3Parser(BaseParser):
 
         await page.click(auth["cookies_selector"])
         await page.click(auth["login_selector"])
-        await page.wait_for_timeout(1000)
+        await self.readiness.wait(
+            page, "login_form", default=[{"selector": auth["username_selector"]}]
+        )
 
         is_captcha = await CaptchaManager().check_captcha(page)
 
@@ -42,30 +44,19 @@ class Site3Parser(BaseParser):
     async def parse_topup_data(self, page) -> dict:
         topup_config = self.config["topup"]
 
-        async with page.expect_request(self._is_payment_system_request) as request:
-            await page.reload(wait_until="commit")
-            await page.wait_for_selector(topup_config["success_indicator"])
-            await page.click(topup_config["button_selector"])
-
-        request = await request.value
-        response = await request.response()
-        response_data = await response.json()
+        banner_close = page.locator(topup_config["button_selector"])
 
-        methods = response_data.get("details").get("paymentSystems")
+        # Касса может запросить методы уже при открытии в navigate_to_topup
+        captured = await self.capture.wait_for(
+            page, "payment_systems", trigger=banner_close.click
+        )
+        response_data = captured.data
 
-        payment_methods = []
-        for method in methods:
-            aggregate_type = method.get("key")
-            if aggregate_type in topup_config["valid_methods"]:
-                method_name = method.get("name").capitalize()
-                min_amount = int((method.get("min_limit")).split(".")[0])
+        # Баннер закрываем и тогда, когда ответ уже был пойман - он перекрывает скриншот
+        if await banner_close.is_visible():
+            await banner_close.click()
 
-                payment_methods.append(
-                    {
-                        "method_name": method_name,
-                        "min_amount": min_amount,
-                    }
-                )
+        payment_methods = self.extract_payment_methods(response_data)
 
         return {"site_id": self.config["id"], "payment_methods": payment_methods}
 
@@ -133,12 +124,3 @@ class Site3Parser(BaseParser):
         else:
             self.logger.info("⛔ Login with captcha unsuccessful")
             return False
-
-    def _is_payment_system_request(self, request) -> bool:
-        if "billcheckout.com/api/checkout/" not in request.url:
-            return False
-
-        if request.method != "GET":
-            return False
-
-        return True
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing.util import Finalize
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+PROC = Path("/proc")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# Состояние процесса-воркера: свой event loop и свой ParserManager с браузером
+_loop: asyncio.AbstractEventLoop | None = None
+_manager = None
+
+
+def _init_worker(sites_config: list[dict]):
+    global _loop, _manager
+
+    # parser_manager сам импортирует этот модуль - импортируем внутри функции
+    from config.settings import setup_logging
+    from parser.browser_pool import BrowserPool
+    from parser.executor import ParseExecutor
+    from parser.parser_manager import ParserManager
+
+    setup_logging()
+
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+    # Процесс парсит один сайт за раз - второй браузер ему не нужен
+    _manager = ParserManager(sites_config, None, processes=0)
+    _manager.browser_pool = BrowserPool(size=1)
+    _manager.executor = ParseExecutor(concurrency=1)
+
+    # atexit в дочерних процессах multiprocessing не вызывается, Finalize - вызывается
+    Finalize(None, _shutdown_worker, exitpriority=10)
+
+    logging.getLogger("process_pool").info(f"Worker process {os.getpid()} started")
+
+
+def _shutdown_worker():
+    if _manager is not None and _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(_manager.close())
+        _loop.close()
+
+
+def _parse_site(site_config: dict, previous_hash: str | None) -> tuple[dict, dict]:
+    """Выполняется в процессе-воркере; дедлайн сайта соблюдает сам воркер"""
+    usage_before = _get_usage()
+    start = time.perf_counter()
+
+    result, _ = _loop.run_until_complete(
+        _manager.executor.run_site(
+            site_config, partial(_manager.run_parser, previous_hash=previous_hash)
+        )
+    )
+
+    usage_after = _get_usage()
+    usage = {
+        "pid": os.getpid(),
+        "wall_time": time.perf_counter() - start,
+        "cpu_user": usage_after["cpu_user"] - usage_before["cpu_user"],
+        "cpu_system": usage_after["cpu_system"] - usage_before["cpu_system"],
+        "rss_mb": usage_after["rss_mb"],
+    }
+
+    return result, usage
+
+
+def _get_usage() -> dict:
+    """Потребление воркера вместе с потомками: драйвер Playwright и Chromium"""
+    if PROC.exists():
+        return _get_tree_usage()
+
+    if resource is None:
+        return {"cpu_user": 0.0, "cpu_system": 0.0, "rss_mb": 0.0}
+
+    # Без /proc: RUSAGE_CHILDREN учитывает только завершившихся потомков
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    # ru_maxrss в Linux - килобайты; без /proc текущего RSS нет, берем пик
+    return {
+        "cpu_user": usage.ru_utime + children.ru_utime,
+        "cpu_system": usage.ru_stime + children.ru_stime,
+        "rss_mb": (usage.ru_maxrss + children.ru_maxrss) / 1024,
+    }
+
+
+def _get_tree_usage() -> dict:
+    # Дерево процессов по ppid из /proc/<pid>/stat
+    stats = {}
+    children = defaultdict(list)
+    for stat_file in PROC.glob("[0-9]*/stat"):
+        try:
+            fields = stat_file.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+
+        pid = int(stat_file.parent.name)
+        stats[pid] = fields
+        children[int(fields[1])].append(pid)
+
+    # utime/stime + cutime/cstime: время уже завершившихся браузеров тоже учитывается
+    ticks = os.sysconf("SC_CLK_TCK")
+    usage = {"cpu_user": 0.0, "cpu_system": 0.0, "rss_mb": 0.0}
+
+    pending = [os.getpid()]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+
+        fields = stats.get(pid)
+        if fields is None:
+            continue
+
+        usage["cpu_user"] += (int(fields[11]) + int(fields[13])) / ticks
+        usage["cpu_system"] += (int(fields[12]) + int(fields[14])) / ticks
+        # rss в страницах; сумма текущих RSS дерева, а не пик одного процесса
+        usage["rss_mb"] += int(fields[21]) * PAGE_SIZE / 1024 / 1024
+
+    return usage
+
+
+class ProcessParsePool:
+    """Пул процессов для парсинга: event loop бота не делит CPU с Playwright"""
+
+    def __init__(self, sites_config: list[dict], processes: int):
+        self.processes = max(1, processes)
+        self.sites_config = sites_config
+        self.executor = self._create_executor()
+        self.logger = logging.getLogger("process_pool")
+        self.restarts = 0
+
+        # pid воркера -> накопленное потребление ресурсов
+        self.worker_stats: dict[int, dict] = {}
+
+    async def run_parser(
+        self, site_config: dict, previous_hash: str | None = None
+    ) -> dict:
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+
+        try:
+            result, usage = await loop.run_in_executor(
+                executor, _parse_site, site_config, previous_hash
+            )
+
+        except BrokenProcessPool as e:
+            # Воркер убит (например, OOM браузера) - без пересоздания пул отклонял бы
+            # все следующие задачи
+            self._restart(executor)
+            return {
+                "site_id": site_config["id"],
+                "status": "error",
+                "error_message": f"Worker process died: {e}",
+            }
+
+        self._record(site_config["id"], usage)
+        return result
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.sites_config,),
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        # Одновременно упавшие задачи видят один и тот же сломанный пул
+        if self.executor is not broken:
+            return
+
+        self.restarts += 1
+        self.logger.error(f"💥 Worker process died, restarting pool (#{self.restarts})")
+
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._create_executor()
+
+    def _record(self, site_id: str, usage: dict):
+        stats = self.worker_stats.setdefault(
+            usage["pid"],
+            {
+                "sites": 0,
+                "wall_time": 0.0,
+                "cpu_user": 0.0,
+                "cpu_system": 0.0,
+                "max_rss_mb": 0.0,
+            },
+        )
+
+        stats["sites"] += 1
+        stats["wall_time"] += usage["wall_time"]
+        stats["cpu_user"] += usage["cpu_user"]
+        stats["cpu_system"] += usage["cpu_system"]
+        # Пик по замерам после каждого сайта
+        stats["max_rss_mb"] = max(stats["max_rss_mb"], usage["rss_mb"])
+
+        self.logger.debug(
+            f"{site_id} parsed in process {usage['pid']}: "
+            f"cpu {usage['cpu_user'] + usage['cpu_system']:.2f}s, "
+            f"rss {usage['rss_mb']:.0f}MB"
+        )
+
+    def get_stats(self) -> dict:
+        return {
+            "restarts": self.restarts,
+            "workers": {
+                pid: {key: round(value, 2) for key, value in stats.items()}
+                for pid, stats in self.worker_stats.items()
+            },
+        }
+
+    async def stop(self):
+        await asyncio.to_thread(self.executor.shutdown, wait=True)
+        self.logger.info(f"Process pool stopped. Stats: {self.get_stats()}")
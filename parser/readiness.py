@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from config.settings import READINESS_TIMEOUT
+
+
+# Элемент считается стабильным, если за два кадра не изменились геометрия и число детей
+STABLE_SCRIPT = """
+(selector) => new Promise((resolve) => {
+    const element = document.querySelector(selector);
+    if (!element) return resolve(false);
+
+    const snapshot = () => {
+        const rect = element.getBoundingClientRect();
+        return [rect.x, rect.y, rect.width, rect.height, element.childElementCount].join();
+    };
+    const first = snapshot();
+
+    requestAnimationFrame(() => requestAnimationFrame(() => resolve(first === snapshot())));
+})
+"""
+
+FONTS_SCRIPT = "() => document.fonts.ready.then(() => true)"
+
+
+class ReadinessWaiter:
+    """Условия готовности страницы из секции readiness в sites_config.yaml вместо пауз"""
+
+    KINDS = ("selector", "stable", "response", "fonts", "delay")
+
+    def __init__(
+        self,
+        site_id: str,
+        readiness: dict,
+        capture=None,
+        timeout: int = READINESS_TIMEOUT,
+    ):
+        self.site_id = site_id
+        self.readiness = readiness or {}
+        self.capture = capture
+        self.timeout = timeout
+        self.logger = logging.getLogger(f"readiness.{site_id}")
+
+        for name, conditions in self.readiness.items():
+            for condition in conditions:
+                kind = self._get_kind(condition, name)
+                if kind == "response":
+                    self._check_capture(condition[kind], name)
+
+    async def wait(self, page, name: str, default: list[dict] | None = None):
+        """Ждет условия точки name; неготовность не прерывает парсинг"""
+        conditions = self.readiness.get(name, default or [])
+
+        for condition in conditions:
+            kind = self._get_kind(condition, name)
+            timeout = condition.get("timeout", self.timeout)
+
+            try:
+                await self._wait_condition(page, kind, condition[kind], timeout)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Readiness '{name}' {kind} not met: {e}")
+
+    async def _wait_condition(self, page, kind: str, value, timeout: int):
+        if kind == "selector":
+            await page.locator(value).first.wait_for(state="visible", timeout=timeout)
+
+        elif kind == "stable":
+            await page.locator(value).first.wait_for(state="visible", timeout=timeout)
+            await page.wait_for_function(STABLE_SCRIPT, arg=value, timeout=timeout)
+
+        elif kind == "response":
+            # Ответ предиката capture, пришедший после текущей навигации страницы
+            await self.capture.wait_for(page, value, timeout=timeout)
+
+        elif kind == "fonts":
+            await page.wait_for_function(FONTS_SCRIPT, timeout=timeout)
+
+        elif kind == "delay":
+            await asyncio.sleep(value / 1000)
+
+    def _get_kind(self, condition: dict, name: str) -> str:
+        kinds = [key for key in condition if key in self.KINDS]
+
+        if len(kinds) != 1:
+            raise ValueError(
+                f"{self.site_id}: readiness '{name}' condition must have exactly one "
+                f"of {', '.join(self.KINDS)}, got {condition}"
+            )
+
+        return kinds[0]
+
+    def _check_capture(self, capture_name: str, name: str):
+        if self.capture is None or capture_name not in self.capture.rules:
+            raise ValueError(
+                f"{self.site_id}: readiness '{name}' waits for response "
+                f"'{capture_name}', but there is no such capture predicate"
+            )
@@ -0,0 +1,93 @@
+import logging
+
+
+class RequestBlocker:
+    """Отсекает лишние запросы контекста по сетевому профилю сайта"""
+
+    # Типичный размер ответа по типу ресурса, байты - для оценки экономии.
+    # Заблокированный запрос ничего не загружает, поэтому размер берется априорный;
+    # переопределяется через estimated_sizes в профиле
+    DEFAULT_SIZE_ESTIMATES = {
+        "image": 30_000,
+        "font": 50_000,
+        "media": 500_000,
+        "script": 60_000,
+        "stylesheet": 20_000,
+        "xhr": 2_000,
+        "fetch": 2_000,
+        "texttrack": 5_000,
+        "manifest": 1_000,
+    }
+    DEFAULT_SIZE_ESTIMATE = 10_000
+
+    def __init__(self, site_id: str, profile: dict):
+        self.block_types = set(profile.get("block_resource_types", []))
+        self.block_patterns = profile.get("block_url_patterns", [])
+        self.allow_patterns = profile.get("allow_url_patterns", [])
+        self.size_estimates = {
+            **self.DEFAULT_SIZE_ESTIMATES,
+            **profile.get("estimated_sizes", {}),
+        }
+        self.logger = logging.getLogger(f"request_blocker.{site_id}")
+
+        self.stats = {
+            "requests": 0,
+            "blocked": 0,
+            "blocked_by_type": {},
+            "bytes_loaded": 0,
+            "bytes_saved_estimate": 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RequestBlocker | None":
+        profile = config.get("network")
+        if not profile:
+            return None
+
+        return cls(config["id"], profile)
+
+    async def attach(self, context):
+        await context.route("**/*", self._handle_route)
+        context.on("response", self._on_response)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if any(pattern in url for pattern in self.allow_patterns):
+            return False
+
+        if resource_type in self.block_types:
+            return True
+
+        return any(pattern in url for pattern in self.block_patterns)
+
+    async def _handle_route(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        self.stats["requests"] += 1
+
+        if not self.should_block(request.url, resource_type):
+            await route.fallback()
+            return
+
+        self.stats["blocked"] += 1
+        by_type = self.stats["blocked_by_type"]
+        by_type[resource_type] = by_type.get(resource_type, 0) + 1
+
+        self.stats["bytes_saved_estimate"] += self.size_estimates.get(
+            resource_type, self.DEFAULT_SIZE_ESTIMATE
+        )
+
+        await route.abort("blockedbyclient")
+
+    def _on_response(self, response):
+        # Заголовки уже пришли с событием - без лишнего запроса к драйверу, как sizes()
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit():
+            self.stats["bytes_loaded"] += int(content_length)
+
+    def log_stats(self):
+        stats = self.stats
+        self.logger.info(
+            f"🧹 Blocked {stats['blocked']}/{stats['requests']} requests "
+            f"{stats['blocked_by_type']}, loaded {stats['bytes_loaded'] / 1024:.0f} KB, "
+            f"saved ~{stats['bytes_saved_estimate'] / 1024:.0f} KB"
+        )
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import re
+from collections import deque
+from config.settings import BROWSER_TIMEOUT, CAPTURE_BUFFER_SIZE
+
+
+class CapturedResponse:
+    def __init__(self, request, response, data):
+        self.request = request
+        self.response = response
+        self.data = data
+        self.url = response.url
+
+
+class ResponseCapture:
+    """Буфер JSON-ответов под предикаты capture из sites_config.yaml"""
+
+    def __init__(
+        self,
+        site_id: str,
+        predicates: dict[str, dict],
+        buffer_size: int = CAPTURE_BUFFER_SIZE,
+    ):
+        self.site_id = site_id
+        self.buffer_size = buffer_size
+        self.logger = logging.getLogger(f"capture.{site_id}")
+
+        self.rules = {
+            name: self.compile_predicate(spec) for name, spec in predicates.items()
+        }
+
+        # page -> имя предиката -> последние ответы текущего документа страницы
+        self.buffers: dict[object, dict[str, deque[CapturedResponse]]] = {}
+        # page -> номер документа: растет на каждой навигации главного фрейма
+        self._documents: dict[object, int] = {}
+        self._events: dict[tuple, asyncio.Event] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ResponseCapture":
+        return cls(config["id"], config.get("capture", {}))
+
+    @staticmethod
+    def compile_predicate(spec: dict):
+        url_contains = spec.get("url_contains")
+        url_regex = re.compile(spec["url_regex"]) if spec.get("url_regex") else None
+        method = spec.get("method", "").upper()
+
+        if not url_contains and not url_regex:
+            raise ValueError("Capture predicate needs url_contains or url_regex")
+
+        def match(request) -> bool:
+            if method and request.method != method:
+                return False
+            if url_contains and url_contains not in request.url:
+                return False
+            if url_regex and not url_regex.search(request.url):
+                return False
+            return True
+
+        return match
+
+    async def attach(self, context):
+        # С момента создания контекста: ответы, пришедшие до ожидания, не теряются
+        context.on("page", self._watch_page)
+
+        for page in context.pages:
+            self._watch_page(page)
+
+    def _watch_page(self, page):
+        page.on("response", lambda response: self._on_response(page, response))
+
+    def _on_response(self, page, response):
+        request = response.request
+
+        # goto()/reload() грузят новый документ: ответы прошлого уже не актуальны.
+        # Навигации внутри документа (pushState) запросов не делают и буфер не трогают
+        if request.is_navigation_request() and request.frame == page.main_frame:
+            self._documents[page] = self._documents.get(page, 0) + 1
+            self.buffers.pop(page, None)
+
+        document = self._documents.get(page, 0)
+
+        for name, match in self.rules.items():
+            if match(request):
+                task = asyncio.create_task(
+                    self._store(page, name, request, response, document)
+                )
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _store(self, page, name: str, request, response, document: int):
+        try:
+            data = await response.json()
+        except Exception as e:
+            self.logger.debug(f"Skipped {name} response {response.url}: {e}")
+            return
+
+        # Пока читалось тело, страница успела перейти на другой документ
+        if self._documents.get(page, 0) != document:
+            self.logger.debug(f"Skipped stale {name} response {response.url}")
+            return
+
+        buffers = self.buffers.setdefault(page, {})
+        buffers.setdefault(name, deque(maxlen=self.buffer_size)).append(
+            CapturedResponse(request, response, data)
+        )
+        self._get_event(page, name).set()
+
+    def _get_event(self, page, name: str) -> asyncio.Event:
+        return self._events.setdefault((page, name), asyncio.Event())
+
+    def latest(self, page, name: str) -> CapturedResponse | None:
+        buffer = self.buffers.get(page, {}).get(name)
+        return buffer[-1] if buffer else None
+
+    async def wait_for(
+        self, page, name: str, trigger=None, timeout: int = BROWSER_TIMEOUT
+    ) -> CapturedResponse:
+        """Последний ответ текущего документа страницы; если его нет - выполняет trigger и ждет"""
+        if name not in self.rules:
+            raise ValueError(f"No capture predicate '{name}' for {self.site_id}")
+
+        captured = self.latest(page, name)
+        if captured:
+            self.logger.info(f"♻️ Using already captured {name} response")
+            return captured
+
+        event = self._get_event(page, name)
+        event.clear()
+
+        if trigger is not None:
+            await trigger()
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout / 1000)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No {name} response captured in {timeout}ms")
+
+        return self.latest(page, name)
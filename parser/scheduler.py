@@ -1,4 +1,11 @@
+from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from config.settings import (
+    JOB_POLL_INTERVAL,
+    MAINTENANCE_INTERVAL_HOURS,
+    PARSER_MODE,
+)
+from parser.adaptive_schedule import SiteSchedule
 from parser.parser_manager import ParserManager
 import logging
 
@@ -8,14 +15,40 @@ class ParserScheduler:
         self.parser_manager = parser_manager
         self.scheduler = AsyncIOScheduler()
         self.interval_hours = interval_hours
+        self.schedules: dict[str, SiteSchedule] = {}
         self.logger = logging.getLogger("scheduler")
 
     def start(self):
+        for site_config in self.parser_manager.sites_config:
+            if not site_config.get("enabled", True):
+                continue
+
+            schedule = SiteSchedule(site_config, self.interval_hours * 60)
+            self.schedules[schedule.site_id] = schedule
+
+            # В режиме очереди стартовый цикл не запускается в main.py
+            if PARSER_MODE == "queue":
+                self._schedule_site(schedule, delay=schedule.initial_delay())
+            else:
+                self._schedule_site(schedule)
+
+        if PARSER_MODE == "queue":
+            # Итоги задач воркеров управляют следующим запуском сайта
+            self.scheduler.add_job(
+                self._collect_finished_jobs,
+                "interval",
+                seconds=JOB_POLL_INTERVAL,
+                id="collect_jobs",
+                replace_existing=True,
+                coalesce=True,
+                max_instances=1,
+            )
+
         self.scheduler.add_job(
-            self.parser_manager.parse_all_sites,
+            self.parser_manager.run_maintenance,
             "interval",
-            hours=self.interval_hours,
-            id="parse_sites",
+            hours=MAINTENANCE_INTERVAL_HOURS,
+            id="maintenance",
             replace_existing=True,
         )
 
@@ -26,7 +59,158 @@ class ParserScheduler:
         # )
 
         self.scheduler.start()
-        self.logger.info(f"Scheduler started. Interval: {self.interval_hours} hour(s)")
+        self.logger.info(
+            f"Scheduler started ({PARSER_MODE} mode). Intervals: "
+            + ", ".join(
+                f"{site_id}={schedule.base_interval / 60:g}m"
+                for site_id, schedule in self.schedules.items()
+            )
+        )
+
+    def _schedule_site(self, schedule: SiteSchedule, delay: float | None = None):
+        if delay is None:
+            delay = schedule.next_delay()
+
+        self.scheduler.add_job(
+            self._enqueue_site if PARSER_MODE == "queue" else self._run_site,
+            "date",
+            run_date=datetime.now() + timedelta(seconds=delay),
+            args=[schedule.site_id],
+            id=f"parse:{schedule.site_id}",
+            replace_existing=True,
+            misfire_grace_time=None,
+            coalesce=True,
+        )
+
+        self.logger.debug(f"Next run of {schedule.site_id} in {delay / 60:.1f}m")
+
+    async def _run_site(self, site_id: str):
+        schedule = self.schedules.get(site_id)
+        site_config = self.parser_manager.get_site_config(site_id)
+
+        if schedule is None or site_config is None:
+            return
+
+        status, changed = None, None
+
+        try:
+            result = await self.parser_manager.parse_site(site_config)
+            status, changed = result.get("status"), result.get("changed")
+
+        except Exception as e:
+            self.logger.error(f"Scheduled run of {site_id} failed: {e}")
+
+        finally:
+            # Пока шел парсинг, сайт могли убрать или перенастроить в sites_config.yaml
+            schedule = self.schedules.get(site_id)
+
+            if schedule is not None:
+                schedule.record(status, changed)
+                self._schedule_site(schedule)
+
+                self.logger.info(
+                    f"{site_id}: status={status}, changed={changed}, "
+                    f"next interval {schedule.current_interval() / 60:.0f}m "
+                    f"(failures={schedule.failures}, unchanged={schedule.unchanged_streak})"
+                )
+
+    async def _enqueue_site(self, site_id: str):
+        schedule = self.schedules.get(site_id)
+
+        if schedule is None:
+            return
+
+        try:
+            job_id = await self.parser_manager.db.enqueue_job(site_id)
+
+        except Exception as e:
+            self.logger.error(f"Failed to enqueue {site_id}: {e}")
+            schedule = self.schedules.get(site_id)
+            if schedule is not None:
+                schedule.record(None, None)
+                self._schedule_site(schedule)
+            return
+
+        if job_id is None:
+            self.logger.info(f"{site_id}: previous job is still active, not enqueued")
+        else:
+            self.logger.info(f"{site_id}: enqueued job {job_id}")
+
+        # Пока шла запись в БД, сайт могли убрать из sites_config.yaml
+        schedule = self.schedules.get(site_id)
+        if schedule is None:
+            return
+
+        # Страховка от потерянной задачи; обычно запуск перепланирует _collect_finished_jobs
+        self._schedule_site(schedule, delay=schedule.max_interval)
+
+    async def _collect_finished_jobs(self):
+        try:
+            jobs = await self.parser_manager.db.pop_finished_jobs()
+        except Exception as e:
+            self.logger.error(f"Error collecting finished jobs: {e}")
+            return
+
+        for job in jobs:
+            schedule = self.schedules.get(job["site_id"])
+
+            if schedule is None:
+                continue
+
+            schedule.record(job["result_status"], job["changed"])
+            self._schedule_site(schedule)
+
+            self.logger.info(
+                f"{job['site_id']}: job {job['id']} {job['status']}, "
+                f"status={job['result_status']}, changed={job['changed']}, "
+                f"next interval {schedule.current_interval() / 60:.0f}m"
+            )
+
+    def apply_config_diff(self, diff: dict[str, list[str]]):
+        """Добавляет, снимает и перепланирует только затронутые сайты"""
+        for site_id in diff["removed"]:
+            self._unschedule_site(site_id)
+
+        for site_id in diff["added"] + diff["changed"]:
+            site_config = self.parser_manager.get_site_config(site_id)
+
+            if site_config is None or not site_config.get("enabled", True):
+                self._unschedule_site(site_id)
+                continue
+
+            schedule = SiteSchedule(site_config, self.interval_hours * 60)
+            current = self.schedules.get(site_id)
+
+            if current is None:
+                self.schedules[site_id] = schedule
+                self._schedule_site(schedule, delay=schedule.initial_delay())
+                self.logger.info(f"{site_id}: added to schedule")
+
+            elif (schedule.base_interval, schedule.max_interval, schedule.jitter) != (
+                current.base_interval,
+                current.max_interval,
+                current.jitter,
+            ):
+                # История запусков сохраняется, меняются только интервалы
+                schedule.failures = current.failures
+                schedule.unchanged_streak = current.unchanged_streak
+                self.schedules[site_id] = schedule
+                self._schedule_site(schedule)
+                self.logger.info(
+                    f"{site_id}: rescheduled, interval {schedule.base_interval / 60:g}m"
+                )
+
+            # Иначе сменились только селекторы или правила - следующий запуск их возьмет
+
+    def _unschedule_site(self, site_id: str):
+        if self.schedules.pop(site_id, None) is None:
+            return
+
+        job_id = f"parse:{site_id}"
+        if self.scheduler.get_job(job_id):
+            self.scheduler.remove_job(job_id)
+
+        self.logger.info(f"{site_id}: removed from schedule")
 
     def stop(self):
         self.scheduler.shutdown()
@@ -1,20 +1,172 @@
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
-from config.settings import SCREENSHOT_PATH
+from config.settings import (
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_PATH,
+    SCREENSHOT_QUALITY,
+    SCREENSHOT_WORKERS,
+)
 
 
 class ScreenshotManager:
-    def __init__(self, retention_days: int = None):
+    # Формат -> (формат Pillow, расширение файла)
+    FORMATS = {
+        "webp": ("WEBP", ".webp"),
+        "jpeg": ("JPEG", ".jpg"),
+        "png": ("PNG", ".png"),
+    }
+    ERRORS_DIR = "errors"
+
+    # Кодирование изображений не должно блокировать event loop
+    _executor = ThreadPoolExecutor(
+        max_workers=SCREENSHOT_WORKERS, thread_name_prefix="screenshot"
+    )
+
+    def __init__(self, retention_days: int = None, image_format: str = None):
         from config.settings import SCREENSHOT_RETENTION_DAYS
 
         self.base_path = Path(SCREENSHOT_PATH)
         self.retention_days = retention_days or SCREENSHOT_RETENTION_DAYS
+        self.image_format = (image_format or SCREENSHOT_FORMAT).lower()
+        if self.image_format not in self.FORMATS:
+            raise ValueError(f"Unsupported screenshot format: {self.image_format}")
         self.logger = logging.getLogger("screenshot_manager")
 
-    def get_screenshot_path(self, site_id: str) -> str:
+    async def save(self, site_id: str, image: bytes) -> str:
+        """Сохраняет PNG-снимок под именем по хэшу содержимого, возвращает путь"""
+        return await self._run(self._store, self.base_path / site_id, image)
+
+    async def save_error(self, site_id: str, image: bytes) -> str:
+        return await self._run(
+            self._store, self.base_path / self.ERRORS_DIR / site_id, image
+        )
+
+    async def sweep(self, site_ids: set[str] | None = None) -> int:
+        """Удаляет снимки старше retention_days, возвращает число удаленных файлов
+
+        Папки error-скриншотов сайтов не из site_ids удаляются целиком.
+        """
+        return await self._run(self._sweep, site_ids)
+
+    def get_latest_screenshot(self, site_id: str) -> str | None:
         site_dir = self.base_path / site_id
-        site_dir.mkdir(parents=True, exist_ok=True)
+        if not site_dir.is_dir():
+            return None
+
+        files = [
+            path
+            for path in site_dir.iterdir()
+            if path.is_file() and path.suffix != ".tmp"
+        ]
+        if not files:
+            return None
+
+        return str(max(files, key=lambda path: path.stat().st_mtime))
+
+    @staticmethod
+    def get_content_hash(path: str) -> str:
+        return Path(path).stem
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _store(self, directory: Path, image: bytes) -> str:
+        directory.mkdir(parents=True, exist_ok=True)
+
+        _, extension = self.FORMATS[self.image_format]
+        content_hash = hashlib.sha256(image).hexdigest()[:32]
+        path = directory / f"{content_hash}{extension}"
+
+        if path.exists():
+            # Такой снимок уже есть - только освежаем mtime для ретеншна
+            os.utime(path)
+            self.logger.info(f"Screenshot unchanged: {path}")
+            return str(path)
+
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(self._encode(image))
+        os.replace(tmp_path, path)
+
+        self.logger.info(f"Screenshot saved: {path}")
+        return str(path)
+
+    def _encode(self, image: bytes) -> bytes:
+        if self.image_format == "png":
+            return image
+
+        from PIL import Image
+
+        pillow_format, _ = self.FORMATS[self.image_format]
+        buffer = io.BytesIO()
+
+        with Image.open(io.BytesIO(image)) as picture:
+            if pillow_format == "JPEG":
+                picture = picture.convert("RGB")
+            picture.save(buffer, format=pillow_format, quality=SCREENSHOT_QUALITY)
+
+        return buffer.getvalue()
+
+    def _sweep(self, site_ids: set[str] | None) -> int:
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+
+        # Старые error-скриншоты с таймстампом лежат прямо в корне
+        for path in self.base_path.iterdir():
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+
+        for directory in self.base_path.iterdir():
+            if not directory.is_dir() or directory.name == self.ERRORS_DIR:
+                continue
+
+            files = sorted(
+                (path for path in directory.iterdir() if path.is_file()),
+                key=lambda path: path.stat().st_mtime,
+            )
+
+            # Последний снимок сайта оставляем всегда: на него ссылается БД
+            for path in files[:-1]:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+
+        removed += self._sweep_errors(cutoff, site_ids)
+
+        if removed:
+            self.logger.info(f"🧹 Removed {removed} expired screenshot(s)")
+
+        return removed
+
+    def _sweep_errors(self, cutoff: float, site_ids: set[str] | None) -> int:
+        """На error-скриншоты БД не ссылается - для них только срок хранения"""
+        errors_dir = self.base_path / self.ERRORS_DIR
+        if not errors_dir.is_dir():
+            return 0
+
+        removed = 0
+        for directory in errors_dir.iterdir():
+            if not directory.is_dir():
+                continue
+
+            files = [path for path in directory.iterdir() if path.is_file()]
+
+            if site_ids is not None and directory.name not in site_ids:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += len(files)
+                continue
 
-        filename = f"{site_id}.png"
+            for path in files:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    removed += 1
 
-        return str(site_dir / filename)
+        return removed
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+from config.settings import SESSIONS_PATH, SESSION_MAX_AGE_HOURS
+
+
+class SessionStore:
+    """Хранилище Playwright storage_state авторизованных сессий по site_id"""
+
+    def __init__(
+        self,
+        base_path: Path = SESSIONS_PATH,
+        max_age_hours: int = SESSION_MAX_AGE_HOURS,
+    ):
+        self.base_path = Path(base_path)
+        self.max_age_seconds = max_age_hours * 3600
+        self.logger = logging.getLogger("session_store")
+
+        self.base_path.mkdir(parents=True, exist_ok=True)
+
+    def get_path(self, site_id: str) -> Path:
+        return self.base_path / f"{site_id}.json"
+
+    def get_endpoint_path(self, site_id: str) -> Path:
+        return self.base_path / f"{site_id}.endpoint.json"
+
+    def load(self, site_id: str) -> str | None:
+        """Возвращает путь к сохраненной сессии, если она есть и не устарела"""
+        path = self.get_path(site_id)
+
+        if not path.exists():
+            return None
+
+        age = time.time() - path.stat().st_mtime
+        if self.max_age_seconds and age > self.max_age_seconds:
+            self.logger.info(f"⌛ Session for {site_id} expired ({age / 3600:.1f}h)")
+            self.invalidate(site_id)
+            return None
+
+        return str(path)
+
+    async def save(self, site_id: str, context):
+        path = self.get_path(site_id)
+        tmp_path = path.with_suffix(".tmp")
+
+        # Пишем во временный файл, чтобы параллельный парсинг не прочитал половину
+        await context.storage_state(path=str(tmp_path))
+        os.replace(tmp_path, path)
+
+        self.logger.info(f"💾 Session saved for {site_id}")
+
+    def invalidate(self, site_id: str):
+        path = self.get_path(site_id)
+
+        if path.exists():
+            path.unlink(missing_ok=True)
+            self.logger.info(f"🗑️ Session invalidated for {site_id}")
+
+    def load_endpoint(self, site_id: str) -> dict | None:
+        """Возвращает записанный XHR кассы (url, заголовки, ETag, последний ответ)"""
+        path = self.get_endpoint_path(site_id)
+
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Broken endpoint record for {site_id}: {e}")
+            return None
+
+    def save_endpoint(self, site_id: str, endpoint: dict):
+        path = self.get_endpoint_path(site_id)
+        tmp_path = path.with_suffix(".tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(endpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get_cookie_header(self, site_id: str, url: str) -> str | None:
+        """Собирает заголовок Cookie для url из сохраненного storage_state"""
+        storage_state = self.load(site_id)
+
+        if not storage_state:
+            return None
+
+        with open(storage_state, "r", encoding="utf-8") as f:
+            cookies = json.load(f).get("cookies", [])
+
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        path = parts.path or "/"
+        now = time.time()
+
+        pairs = []
+        for cookie in cookies:
+            domain = cookie.get("domain", "").lstrip(".")
+            expires = cookie.get("expires", -1)
+
+            if host != domain and not host.endswith(f".{domain}"):
+                continue
+            if not path.startswith(cookie.get("path", "/")):
+                continue
+            if expires not in (-1, None) and expires < now:
+                continue
+
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+
+        return "; ".join(pairs) or None
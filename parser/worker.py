@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from config.settings import (
+    JOB_LEASE_SECONDS,
+    JOB_POLL_INTERVAL,
+    PARSE_CONCURRENCY,
+    WORKER_ID,
+)
+from parser.parser_manager import ParserManager
+
+
+class ParseWorker:
+    """Забирает задачи из parse_jobs и парсит сайты; воркеров может быть несколько"""
+
+    def __init__(
+        self,
+        parser_manager: ParserManager,
+        worker_id: str = WORKER_ID,
+        concurrency: int = PARSE_CONCURRENCY,
+    ):
+        self.parser_manager = parser_manager
+        self.db = parser_manager.db
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self.tasks: set[asyncio.Task] = set()
+        self.logger = logging.getLogger("worker")
+
+        self.stats = {"claimed": 0, "finished": 0, "lost": 0}
+
+    async def run(self):
+        self.logger.info(
+            f"👷 Worker {self.worker_id} started (concurrency {self.concurrency})"
+        )
+
+        while True:
+            try:
+                await self.db.requeue_expired_jobs()
+
+                # Берем задач не больше, чем можем парсить одновременно
+                while len(self.tasks) < self.concurrency:
+                    job = await self.db.claim_job(self.worker_id)
+                    if job is None:
+                        break
+
+                    self.stats["claimed"] += 1
+                    task = asyncio.create_task(self.process(job))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+
+            except Exception as e:
+                self.logger.error(f"Error claiming jobs: {e}")
+
+            if self.tasks:
+                await asyncio.wait(
+                    self.tasks,
+                    timeout=JOB_POLL_INTERVAL,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+            else:
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    async def process(self, job: dict):
+        job_id, site_id = job["id"], job["site_id"]
+        self.logger.info(f"Job {job_id}: parsing {site_id} (attempt {job['attempts']})")
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        try:
+            site_config = self.parser_manager.get_site_config(site_id)
+
+            if site_config is None or not site_config.get("enabled", True):
+                result = {
+                    "site_id": site_id,
+                    "status": "error",
+                    "error_message": f"Site {site_id} is not configured on this worker",
+                }
+            else:
+                result = await self.parser_manager.parse_site(site_config)
+
+        except Exception as e:
+            self.logger.error(f"Job {job_id} failed: {e}")
+            result = {"site_id": site_id, "status": "error", "error_message": str(e)}
+
+        finally:
+            heartbeat.cancel()
+
+        try:
+            if await self.db.finish_job(job_id, self.worker_id, result):
+                self.stats["finished"] += 1
+            else:
+                # Аренда истекла и задача ушла другому воркеру; результат уже сохранен
+                self.stats["lost"] += 1
+                self.logger.warning(f"Job {job_id} was reassigned before finishing")
+
+        except Exception as e:
+            self.logger.error(f"Error finishing job {job_id}: {e}")
+
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+
+            try:
+                if not await self.db.heartbeat_job(job_id, self.worker_id):
+                    self.logger.warning(f"Lost lease on job {job_id}")
+                    return
+            except Exception as e:
+                self.logger.error(f"Heartbeat of job {job_id} failed: {e}")
+
+    async def stop(self):
+        for task in list(self.tasks):
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.logger.info(f"👷 Worker {self.worker_id} stopped. Stats: {self.stats}")
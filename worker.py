@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from config.settings import setup_logging, load_config, validate_settings, WORKER_ID
+from parser.config_watcher import ConfigWatcher
+from parser.parser_manager import ParserManager
+from parser.worker import ParseWorker
+from database.db_manager import DBManager
+
+# Настройка логирования
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    try:
+        # Проверка настроек
+        validate_settings()
+
+        logger.info("=" * 60)
+        logger.info(f"👷 Starting Parser Worker {WORKER_ID}")
+        logger.info("=" * 60)
+
+        # Загрузка конфигурации
+        config_watcher = ConfigWatcher()
+        config = load_config()
+        logger.info(f"📋 Loaded config for {len(config['sites'])} sites")
+
+        # Схему создает и мигрирует main.py - воркер только проверяет ее
+        db = DBManager()
+        await db.verify_schema()
+
+        parser_manager = ParserManager(config["sites"], db)
+        worker = ParseWorker(parser_manager)
+
+        # Задачи по измененным сайтам воркер парсит уже с новым конфигом
+        config_watcher.add_listener(parser_manager.apply_sites_config)
+        config_watcher.start()
+
+        await worker.run()
+
+    except KeyboardInterrupt:
+        logger.info("\n⚠️  Received shutdown signal")
+        logger.info("🛑 Shutting down gracefully...")
+        await config_watcher.stop()
+        await worker.stop()
+        await parser_manager.close()
+        await db.close()
+        logger.info("👋 Worker stopped")
+    except Exception as e:
+        logger.error(f"❌ Fatal error: {e}")
+        logger.exception("Full traceback:")
+        raise
+
+
+if __name__ == "__main__":
+    asyncio.run(main())